@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# bench_ExtractRegions.py
+# Times the old (linear scan) and new (binary search) Somatypus_ExtractRegions.py
+
+# INPUT
+# workDir: path to a folder for the synthetic data and outputs (it will be created if needed)
+# --regions N: number of synthetic exome regions (default 200000)
+# --variants N: number of synthetic variants across the four VCFs (default 1000000)
+# --old-regions N: number of regions used to time the old script (default 2000)
+
+
+"""
+This script generates a synthetic exome (regions file plus allele 1/2/3 and indel VCFs),
+runs the current Somatypus_ExtractRegions.py on all of it, and runs the pre-optimisation
+version kept in benchmarks/reference on the first --old-regions regions only, since the old
+linear scan takes hours at full scale. The old run time is extrapolated to the full regions
+file, and the outputs of both versions are compared on the common subset.
+"""
+
+
+import sys
+import os
+import random
+import subprocess
+import time
+from optparse import OptionParser
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NEW_SCRIPT = os.path.join(HERE, '..', 'src', 'Somatypus_ExtractRegions.py')
+OLD_SCRIPT = os.path.join(HERE, 'reference', 'Somatypus_ExtractRegions.py')
+OUTPUTS = ['regions_allele1.txt', 'regions_allele2.txt', 'regions_allele3.txt', 'regions_indels.txt']
+
+# Chromosome lengths (Mb) of a small synthetic genome, and fraction of variants per VCF
+CHROMS = [(str(i), 250 - 9 * i) for i in range(1, 23)] + [('X', 155)]
+FRACTIONS = [('allele1', 0.90), ('allele2', 0.04), ('allele3', 0.01), ('indels', 0.05)]
+
+
+def generate_exome(workDir, nRegions, nVariants, seed=1):
+    """Writes regions.txt and four VCFs with positions inside and outside the regions."""
+    rand = random.Random(seed)
+    total = sum(length for chrom, length in CHROMS)
+    regions = []
+    for chrom, length in CHROMS:
+        n = nRegions * length // total
+        starts = sorted(rand.sample(xrange(1, length * 1000000 - 1000), n))
+        regions.extend((chrom, s, s + rand.randint(80, 400)) for s in starts)
+    with open(os.path.join(workDir, 'regions.txt'), 'w') as out:
+        for chrom, start, end in regions:
+            out.write('%s:%d-%d\n' % (chrom, start, end))
+
+    # Two thirds of the variants fall inside regions, the rest anywhere in the genome
+    for name, fraction in FRACTIONS:
+        n = int(nVariants * fraction)
+        variants = []
+        for i in xrange(n):
+            if i % 3:
+                chrom, start, end = rand.choice(regions)
+                pos = rand.randint(start, end)
+            else:
+                chrom, length = rand.choice(CHROMS)
+                pos = rand.randint(1, length * 1000000)
+            variants.append((chrom, pos))
+        variants.sort()
+        with open(os.path.join(workDir, name + '.vcf'), 'w') as out:
+            for chrom, pos in variants:
+                out.write('%s\t%d\t.\tA\tC\t100\tPASS\t.\tGT:NR:NV\t0/1:20:5\n' % (chrom, pos))
+    return len(regions)
+
+
+def run(script, regionsFile, workDir, outDir):
+    """Runs an ExtractRegions script and returns its wall time in seconds."""
+    if not os.path.isdir(outDir):
+        os.makedirs(outDir)
+    vcfs = [os.path.join(workDir, name + '.vcf') for name, fraction in FRACTIONS]
+    start = time.time()
+    with open(os.devnull, 'w') as devnull:
+        subprocess.check_call([sys.executable, script, regionsFile] + vcfs + [outDir, '0'], stdout=devnull)
+    return time.time() - start
+
+
+def same_outputs(dir1, dir2):
+    for name in OUTPUTS:
+        with open(os.path.join(dir1, name)) as f1, open(os.path.join(dir2, name)) as f2:
+            if f1.read() != f2.read():
+                return False
+    return True
+
+
+parser = OptionParser(usage='%prog [options] /path/to/workDir')
+parser.add_option('--regions', type='int', default=200000)
+parser.add_option('--variants', type='int', default=1000000)
+parser.add_option('--old-regions', dest='oldRegions', type='int', default=2000)
+options, args = parser.parse_args()
+if len(args) != 1:
+    parser.print_help()
+    sys.exit(0)
+
+workDir = args[0]
+if not os.path.isdir(workDir):
+    os.makedirs(workDir)
+
+print '\nGenerating synthetic exome in', workDir
+nRegions = generate_exome(workDir, options.regions, options.variants)
+regionsFile = os.path.join(workDir, 'regions.txt')
+subsetFile = os.path.join(workDir, 'regions_subset.txt')
+with open(regionsFile) as regions, open(subsetFile, 'w') as subset:
+    for i, line in enumerate(regions):
+        if i == options.oldRegions:
+            break
+        subset.write(line)
+nSubset = min(nRegions, options.oldRegions)
+print nRegions, 'regions,', options.variants, 'variants'
+
+newTime = run(NEW_SCRIPT, regionsFile, workDir, os.path.join(workDir, 'new'))
+newSubsetTime = run(NEW_SCRIPT, subsetFile, workDir, os.path.join(workDir, 'new_subset'))
+oldSubsetTime = run(OLD_SCRIPT, subsetFile, workDir, os.path.join(workDir, 'old_subset'))
+oldTime = oldSubsetTime * nRegions / float(nSubset)
+
+print '\nNew, all %d regions:      %10.2f s' % (nRegions, newTime)
+print 'New, first %d regions:    %10.2f s' % (nSubset, newSubsetTime)
+print 'Old, first %d regions:    %10.2f s' % (nSubset, oldSubsetTime)
+print 'Old, all regions (extrapolated): %10.2f s' % oldTime
+if same_outputs(os.path.join(workDir, 'new_subset'), os.path.join(workDir, 'old_subset')):
+    print '\nOutputs of old and new versions are identical'
+else:
+    print '\nERROR: Outputs of old and new versions differ'
+    sys.exit(1)
+print 'Done\n'
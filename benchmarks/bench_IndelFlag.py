@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# bench_IndelFlag.py
+# Measures run time and peak memory of the old and new Somatypus_IndelFlag.py
+
+# INPUT
+# workDir: path to a folder for the synthetic data and outputs (it will be created if needed)
+# --samples N: number of synthetic samples (default 50)
+# --sites N: number of variant sites in the cohort (default 200000)
+
+
+"""
+This script generates a synthetic cohort of split (bi-allelic SNV and indel) Platypus VCFs,
+runs the current Somatypus_IndelFlag.py and the pre-optimisation version kept in
+benchmarks/reference on it, and reports the wall time and peak resident memory of each,
+checking that both produce the same list of indel-flagged SNVs.
+"""
+
+
+import sys
+import os
+from optparse import OptionParser
+from benchlib import SRC, REFERENCE, make_cohort, write_list, run_measured, same_files
+
+
+parser = OptionParser(usage='%prog [options] /path/to/workDir')
+parser.add_option('--samples', type='int', default=50)
+parser.add_option('--sites', type='int', default=200000)
+options, args = parser.parse_args()
+if len(args) != 1:
+    parser.print_help()
+    sys.exit(0)
+
+workDir = args[0]
+print '\nGenerating', options.samples, 'synthetic samples in', workDir
+vcfs = make_cohort(os.path.join(workDir, 'cohort'), options.samples, options.sites,
+                   fractions={'snv': 0.9, 'ins': 0.05, 'del': 0.05})
+fileList = write_list(os.path.join(workDir, 'list.txt'), vcfs)
+
+results = []
+for name, script in [('Old', os.path.join(REFERENCE, 'Somatypus_IndelFlag.py')),
+                     ('New', os.path.join(SRC, 'Somatypus_IndelFlag.py'))]:
+    outFile = os.path.join(workDir, 'flagged_%s.txt' % name.lower())
+    wall, cpu, rss = run_measured([script, fileList, outFile])
+    results.append(outFile)
+    print '%s: %8.2f s wall, %8.2f s CPU, %8.1f MB peak RSS' % (name, wall, cpu, rss)
+
+if same_files(results[0], results[1]):
+    print '\nOutputs of old and new versions are identical'
+else:
+    print '\nERROR: Outputs of old and new versions differ'
+    sys.exit(1)
+print 'Done\n'
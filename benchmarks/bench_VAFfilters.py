@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# bench_VAFfilters.py
+# Measures the throughput of the old and new Somatypus_VAFfilter.py and Somatypus_IndelRescuedFilter.py
+
+# INPUT
+# workDir: path to a folder for the synthetic data and outputs (it will be created if needed)
+# --samples N: number of samples in the synthetic VCF (default 100)
+# --records N: number of records in the synthetic VCF (default 50000)
+
+
+"""
+This script generates a synthetic multi-sample genotyped VCF, runs the current
+Somatypus_VAFfilter.py and Somatypus_IndelRescuedFilter.py and the pre-optimisation versions
+kept in benchmarks/reference on it, and reports the records processed per second by each,
+checking that the old and new versions produce identical output files.
+"""
+
+
+import sys
+import os
+import random
+import shutil
+from optparse import OptionParser
+from benchlib import SRC, REFERENCE, header, record, make_sites, run_measured, same_files
+
+
+parser = OptionParser(usage='%prog [options] /path/to/workDir')
+parser.add_option('--samples', type='int', default=100)
+parser.add_option('--records', type='int', default=50000)
+options, args = parser.parse_args()
+if len(args) != 1:
+    parser.print_help()
+    sys.exit(0)
+
+workDir = args[0]
+if not os.path.isdir(workDir):
+    os.makedirs(workDir)
+
+print '\nGenerating a VCF with', options.records, 'records and', options.samples, 'samples in', workDir
+rand = random.Random(1)
+samples = ['sample%03d' % (i + 1) for i in range(options.samples)]
+vcfFile = os.path.join(workDir, 'genotyped.vcf')
+sites = make_sites(rand, options.records, {'snv': 1.0})
+with open(vcfFile, 'w') as out:
+    out.write(header(samples))
+    for chrom, pos, ref, alts in sites:
+        # Some variants are present (at high VAF) in every sample
+        presence = 1.0 if rand.random() < 0.1 else rand.uniform(0.05, 0.8)
+        out.write(record(rand, chrom, pos, ref, alts, [rand.random() < presence for s in samples]))
+
+for script in ['Somatypus_VAFfilter.py', 'Somatypus_IndelRescuedFilter.py']:
+    print '\n' + script
+    results = []
+    for name, folder in [('Old', REFERENCE), ('New', SRC)]:
+        # Each script writes its output next to its input
+        inFile = os.path.join(workDir, 'genotyped_%s.vcf' % name.lower())
+        shutil.copy(vcfFile, inFile)
+        wall, cpu, rss = run_measured([os.path.join(folder, script), inFile])
+        results.append(inFile[:-4] + '.VAFfilt.vcf')
+        print '%s: %8.2f s wall, %10.0f records/s, %8.1f MB peak RSS' % (name, wall, len(sites) / wall, rss)
+    if same_files(results[0], results[1]):
+        print 'Outputs of old and new versions are identical'
+    else:
+        print 'ERROR: Outputs of old and new versions differ'
+        sys.exit(1)
+
+print '\nDone\n'
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# bench_compression.py
+# Measures the BGZF compression and decompression throughput for different numbers of threads
+
+# INPUT
+# workDir: path to a folder for the synthetic data (it will be created if needed)
+# --samples N: number of samples in the synthetic VCF (default 20)
+# --records N: number of records in the synthetic VCF (default 100000)
+# --threads N: largest number of threads to measure (default 4)
+
+
+"""
+This script generates a synthetic multi-sample Platypus VCF, and measures the speed (MB of
+uncompressed VCF per second) of writing it in BGZF format with somatypuslib.bgzf, and of
+reading it back through somatypuslib.vcf.open_vcf, for 1 to --threads threads. Reading
+the uncompressed VCF and writing and reading it with Python's gzip module are measured for
+comparison. All the compressed files are checked to decompress into the original VCF.
+"""
+
+
+import sys
+import os
+import gzip
+import random
+import time
+from optparse import OptionParser
+from benchlib import SRC, header, record, make_sites
+
+sys.path.insert(0, SRC)
+from somatypuslib.bgzf import BgzfWriter
+from somatypuslib.vcf import open_vcf
+import somatypuslib.bgzf
+
+
+# Size of the chunks written to the compressed files (bytes)
+CHUNKSIZE = 1 << 20
+
+
+def write_chunks(out, data):
+    for i in xrange(0, len(data), CHUNKSIZE):
+        out.write(data[i:i + CHUNKSIZE])
+
+
+def read_lines(f):
+    lines = []
+    for line in f:
+        lines.append(line)
+    f.close()
+    return ''.join(lines)
+
+
+parser = OptionParser(usage='%prog [options] /path/to/workDir')
+parser.add_option('--samples', type='int', default=20)
+parser.add_option('--records', type='int', default=100000)
+parser.add_option('--threads', type='int', default=4)
+options, args = parser.parse_args()
+if len(args) != 1:
+    parser.print_help()
+    sys.exit(0)
+
+workDir = args[0]
+if not os.path.isdir(workDir):
+    os.makedirs(workDir)
+
+print '\nGenerating a VCF with', options.records, 'records and', options.samples, 'samples in', workDir
+rand = random.Random(1)
+samples = ['sample%03d' % (i + 1) for i in range(options.samples)]
+vcfFile = os.path.join(workDir, 'variants.vcf')
+sites = make_sites(rand, options.records, {'snv': 0.9, 'ins': 0.05, 'del': 0.05})
+with open(vcfFile, 'w') as out:
+    out.write(header(samples))
+    for chrom, pos, ref, alts in sites:
+        out.write(record(rand, chrom, pos, ref, alts, [rand.random() < 0.5 for s in samples]))
+with open(vcfFile, 'rb') as vcf:
+    data = vcf.read()
+size = len(data) / 1e6
+print 'VCF size: %.1f MB' % size
+
+
+print '\n%-24s %12s %12s %14s' % ('Method', 'Write (MB/s)', 'Read (MB/s)', 'Compressed (MB)')
+
+start = time.time()
+read_lines(open_vcf(vcfFile))
+print '%-24s %12s %12.1f %14s' % ('Uncompressed', '-', size / (time.time() - start), '-')
+
+gzFile = os.path.join(workDir, 'variants.gzip.vcf.gz')
+start = time.time()
+with gzip.open(gzFile, 'wb') as out:
+    write_chunks(out, data)
+writeRate = size / (time.time() - start)
+start = time.time()
+if read_lines(gzip.open(gzFile, 'rb')) != data:
+    print 'ERROR: gzip file does not decompress into the original VCF'
+    sys.exit(1)
+print '%-24s %12.1f %12.1f %14.1f' % ('gzip module', writeRate, size / (time.time() - start),
+                                       os.path.getsize(gzFile) / 1e6)
+
+for threads in range(1, options.threads + 1):
+    somatypuslib.bgzf.THREADS = threads
+    bgzfFile = os.path.join(workDir, 'variants.bgzf%d.vcf.gz' % threads)
+    start = time.time()
+    with BgzfWriter(bgzfFile) as out:
+        write_chunks(out, data)
+    writeRate = size / (time.time() - start)
+    start = time.time()
+    if read_lines(open_vcf(bgzfFile)) != data:
+        print 'ERROR: BGZF file does not decompress into the original VCF'
+        sys.exit(1)
+    print '%-24s %12.1f %12.1f %14.1f' % ('BGZF, %d thread(s)' % threads, writeRate,
+                                           size / (time.time() - start), os.path.getsize(bgzfFile) / 1e6)
+
+print '\nDone\n'
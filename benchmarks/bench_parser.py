@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# bench_parser.py
+# Measures the VCF parsing throughput of each script with the old and new parsers
+
+# INPUT
+# workDir: path to a folder for the synthetic data (it will be created if needed)
+# --samples N: number of samples in the synthetic VCF (default 20)
+# --records N: number of records in the synthetic VCF (default 100000)
+
+
+"""
+This script generates a synthetic multi-sample Platypus VCF and, for each script, reads it
+extracting the columns that the script uses: first as the scripts did before (splitting
+every line into all its columns, and sample fields at fixed positions), and then with the
+somatypuslib.vcf reader (VcfReader and VcfRecord). It reports the lines read per second by
+each parser, and checks that both extract the same values.
+"""
+
+
+import sys
+import os
+import random
+import time
+from itertools import izip_longest
+from optparse import OptionParser
+from benchlib import SRC, header, record, make_sites
+
+sys.path.insert(0, SRC)
+from somatypuslib.vcf import VcfReader
+
+
+# Old parsers: each script split every line (col = line.strip().split('\t'))
+def old_lines(vcfFile):
+    with open(vcfFile, 'r') as vcf:
+        for line in vcf:
+            if not line.startswith('#'):
+                yield line.strip().split('\t')
+
+def old_split(vcfFile):
+    # Multiallelic records are split into all their columns; the rest are written unchanged
+    for col in old_lines(vcfFile):
+        alts = col[4].split(',')
+        if len(alts) > 1:
+            yield col[0], col[1], col[2], col[3], alts, col[5], col[6], col[7], col[8], col[9:]
+        else:
+            yield col[3], alts
+
+def old_variant(vcfFile):
+    for col in old_lines(vcfFile):
+        yield col[0], col[1], col[3], col[4]
+
+def old_variant_filter(vcfFile):
+    for col in old_lines(vcfFile):
+        yield col[0], col[1], col[3], col[4], col[6]
+
+def old_position(vcfFile):
+    for col in old_lines(vcfFile):
+        yield col[0], int(col[1])
+
+def old_read_counts(vcfFile):
+    for col in old_lines(vcfFile):
+        yield [record.split(':')[4] for record in col[9:]], [record.split(':')[5] for record in col[9:]]
+
+def old_metadata_counts(vcfFile):
+    for col in old_lines(vcfFile):
+        yield col[:8], [record.split(':')[4] for record in col[9:]], [record.split(':')[5] for record in col[9:]]
+
+
+# New parsers: lazy records from the buffered reader
+def new_split(vcfFile):
+    with VcfReader(vcfFile) as vcf:
+        for rec in vcf:
+            alts = rec.alts
+            if len(alts) > 1:
+                yield rec.chrom, rec.pos, rec.id, rec.ref, alts, rec.qual, rec.filter, rec.info, rec.format, rec.samples
+            else:
+                yield rec.ref, alts
+
+def new_variant(vcfFile):
+    with VcfReader(vcfFile) as vcf:
+        for rec in vcf:
+            yield rec.chrom, rec.pos, rec.ref, rec.alt
+
+def new_variant_filter(vcfFile):
+    with VcfReader(vcfFile) as vcf:
+        for rec in vcf:
+            yield rec.chrom, rec.pos, rec.ref, rec.alt, rec.filter
+
+def new_position(vcfFile):
+    with VcfReader(vcfFile) as vcf:
+        for rec in vcf:
+            yield rec.chrom, int(rec.pos)
+
+def new_read_counts(vcfFile):
+    with VcfReader(vcfFile) as vcf:
+        for rec in vcf:
+            yield tuple(rec.sample_fields('NR', 'NV'))
+
+def new_metadata_counts(vcfFile):
+    with VcfReader(vcfFile) as vcf:
+        for rec in vcf:
+            nr, nv = rec.sample_fields('NR', 'NV')
+            yield rec.fixed, nr, nv
+
+
+# Columns used by each script
+SCRIPTS = [('Somatypus_SplitMA-MNVs.py', old_split, new_split),
+           ('Somatypus_IndelFlag.py', old_variant, new_variant),
+           ('Somatypus_IndelMerge.py', old_variant_filter, new_variant_filter),
+           ('Somatypus_SNVmerge.py', old_variant, new_variant),
+           ('Somatypus_VAFfilter.py', old_read_counts, new_read_counts),
+           ('Somatypus_IndelRescuedFilter.py', old_read_counts, new_read_counts),
+           ('Somatypus_ExtractRegions.py', old_position, new_position),
+           ('ExtractVcfData.py', old_metadata_counts, new_metadata_counts)]
+
+
+parser = OptionParser(usage='%prog [options] /path/to/workDir')
+parser.add_option('--samples', type='int', default=20)
+parser.add_option('--records', type='int', default=100000)
+options, args = parser.parse_args()
+if len(args) != 1:
+    parser.print_help()
+    sys.exit(0)
+
+workDir = args[0]
+if not os.path.isdir(workDir):
+    os.makedirs(workDir)
+
+print '\nGenerating a VCF with', options.records, 'records and', options.samples, 'samples in', workDir
+rand = random.Random(1)
+samples = ['sample%03d' % (i + 1) for i in range(options.samples)]
+vcfFile = os.path.join(workDir, 'variants.vcf')
+sites = make_sites(rand, options.records, {'snv': 0.84, 'ma': 0.03, 'mnp': 0.03, 'ins': 0.05, 'del': 0.05})
+with open(vcfFile, 'w') as out:
+    out.write(header(samples))
+    for chrom, pos, ref, alts in sites:
+        out.write(record(rand, chrom, pos, ref, alts, [rand.random() < 0.5 for s in samples]))
+
+print '\n%-32s %14s %14s %8s' % ('Script', 'Old (lines/s)', 'New (lines/s)', 'Speedup')
+for script, oldParser, newParser in SCRIPTS:
+    rates = []
+    for parse in (oldParser, newParser):
+        start = time.time()
+        for values in parse(vcfFile):
+            pass
+        rates.append(len(sites) / (time.time() - start))
+    for oldValues, newValues in izip_longest(oldParser(vcfFile), newParser(vcfFile)):
+        if oldValues != newValues:
+            print 'ERROR: Old and new parsers extract different values for', script
+            sys.exit(1)
+    print '%-32s %14.0f %14.0f %7.2fx' % (script, rates[0], rates[1], rates[1] / rates[0])
+
+print '\nDone\n'
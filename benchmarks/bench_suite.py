@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# bench_suite.py
+# Runs every Somatypus script on synthetic cohorts of several sizes, measuring throughput and peak memory
+
+# INPUT
+# workDir: path to a folder for the synthetic data and outputs (it will be created if needed)
+# --scales LIST: cohort sizes to run, as SAMPLESxSITES separated by commas (default 10x20000,40x100000)
+# --regions N: number of synthetic exome regions (default 20000)
+# --processes N: processes used by the scripts that process the samples in parallel (default 1)
+# --fixtures PATH: fixtures file with the output hashes of each script (default benchmarks/fixtures.json)
+# --check: compare the outputs with the fixtures (by default, at the scales in the fixtures file,
+#          with the number of regions recorded for each scale)
+# --record: write the output hashes at the given scales to the fixtures file (those of the
+#           baseline scripts in benchmarks/reference, for the scripts that have one)
+
+
+"""
+This script generates, for each cohort size, a synthetic cohort of single-sample Platypus
+VCFs (see benchlib.py) and an exome-like regions file, and runs the Somatypus scripts on it
+in pipeline order, each on the outputs of the previous ones (as the pipeline does for steps
+3-8, 17 and 18, and for incremental runs); the Platypus genotyping of steps 9-16 is replaced
+by synthetic genotyped VCFs of the merged variants. For each script, it reports the wall
+time, CPU time, peak resident memory and input records per second, which are also written
+to results.tsv in the working folder.
+
+Since the synthetic data are generated from a fixed seed, the outputs of each script at a
+given scale (and number of regions) are always the same. With --record, the MD5 hashes of
+the outputs are written to the fixtures file; with --check, the outputs are compared with
+the recorded hashes. For the scripts whose original (unoptimised) version is kept in
+benchmarks/reference, the recorded hashes are those of the outputs of that version, which
+is run first on the same inputs, so that the optimised scripts are checked against the
+original behaviour (the record fails if the current version differs); the outputs that the
+original version does not write (such as the compressed and indexed VCFs of the merge
+scripts), and those of the scripts added since then, are recorded from the current version.
+Somatypus_SNVmerge.py and Somatypus_IndelMerge.py now write the merged variants sorted by
+chromosome and position, rather than in the arbitrary order of the dictionaries in which
+they were merged, so their outputs are hashed after sorting their lines (which compares the
+same headers and variants, in any order). Somatypus_Manifest.py is timed but not checked,
+as its output holds file times, and Somatypus_Telemetry.py is not run, as it only measures
+the other commands.
+"""
+
+
+import sys
+import os
+import glob
+import gzip
+import json
+import shutil
+from optparse import OptionParser
+from benchlib import HERE, SRC, UTILS, REFERENCE, make_cohort, make_regions, write_fai, genotype, count_records, \
+                     digest, write_list, run_measured
+
+
+parser = OptionParser(usage='%prog [options] /path/to/workDir')
+parser.add_option('--scales', default=None)
+parser.add_option('--regions', type='int', default=20000)
+parser.add_option('--processes', type='int', default=1)
+parser.add_option('--fixtures', default=os.path.join(HERE, 'fixtures.json'))
+parser.add_option('--check', action='store_true', default=False)
+parser.add_option('--record', action='store_true', default=False)
+options, args = parser.parse_args()
+if len(args) != 1:
+    parser.print_help()
+    sys.exit(0)
+
+workDir = os.path.abspath(args[0])
+fixtures = {}
+if os.path.exists(options.fixtures):
+    with open(options.fixtures, 'r') as f:
+        fixtures = json.load(f)
+if options.scales is None:
+    if options.check and fixtures:
+        options.scales = ','.join(sorted(fixtures, key=lambda scale: [int(x) for x in scale.split('x')]))
+    else:
+        options.scales = '10x20000,40x100000'
+scales = options.scales.split(',')
+os.environ['SOMATYPUS_PROCESSES'] = str(options.processes)
+os.environ['SOMATYPUS_THREADS'] = '1'
+
+
+# Create the output folders of a scale, and return the path to one of them
+def folder(scaleDir, name):
+    path = os.path.join(scaleDir, name)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    return path
+
+
+# Returns the paths (relative to scaleDir) of the files matching some patterns
+def matching(scaleDir, patterns):
+    paths = []
+    for pattern in patterns:
+        paths.extend(glob.glob(os.path.join(scaleDir, pattern)))
+    return sorted(os.path.relpath(path, scaleDir) for path in paths)
+
+
+# Run a script, and return its measurements and output hashes
+# (inputs are counted for the throughput; outputs are glob patterns relative to scaleDir;
+# baseline is a list with the arguments of each run of the version in benchmarks/reference,
+# whose output hashes are recorded with --record, together with the hashes of any outputs
+# it does not write; if ordered is False, the lines of the outputs are sorted before hashing)
+def run_script(scaleDir, script, args, inputs, outputs, name=None, baseline=None, ordered=True):
+    name = name or os.path.basename(script)
+    logFile = os.path.join(folder(scaleDir, 'logs'), name.replace('.py', '').replace(' ', '_') + '.log')
+    baselineHashes = None
+    if options.record and baseline is not None:
+        for baselineArgs in baseline:
+            run_measured([os.path.join(REFERENCE, os.path.basename(script))] + baselineArgs, logFile[:-4] + '_baseline.log')
+        paths = matching(scaleDir, outputs)
+        baselineHashes = dict((path, digest(os.path.join(scaleDir, path), ordered)) for path in paths)
+        for path in paths:
+            os.remove(os.path.join(scaleDir, path))
+    wall, cpu, rss = run_measured([script] + args, logFile)
+    records = sum(count_records(path) for path in inputs)
+    hashes = dict((path, digest(os.path.join(scaleDir, path), ordered)) for path in matching(scaleDir, outputs))
+    return {'script': name, 'wall': wall, 'cpu': cpu, 'rss': rss, 'records': records,
+            'hashes': hashes, 'baseline': baselineHashes}
+
+
+# Run all the scripts on a synthetic cohort
+def run_scale(scaleDir, nSamples, nSites, nRegions):
+    src = lambda name: os.path.join(SRC, name)
+    results = []
+
+    # Synthetic cohort, genome index and list of unsplit VCFs
+    vcfs = make_cohort(folder(scaleDir, 'cohort'), nSamples, nSites)
+    unsplitList = write_list(os.path.join(scaleDir, 'unsplit.txt'), vcfs)
+    faiFile = write_fai(os.path.join(scaleDir, 'genome.fa.fai'))
+
+    # Steps 3-7, run separately (as with -k)
+    results.append(run_script(scaleDir, src('Somatypus_SplitMA-MNVs.py'), [unsplitList], vcfs,
+                              ['cohort/*.split.vcf'], baseline=[[vcf] for vcf in vcfs]))
+    splitVcfs = sorted(glob.glob(os.path.join(scaleDir, 'cohort', '*.split.vcf')))
+    splitList = write_list(os.path.join(scaleDir, 'split.txt'), splitVcfs)
+    results.append(run_script(scaleDir, src('Somatypus_FlagFilter.py'), [splitList, folder(scaleDir, 'filtered')],
+                              splitVcfs, ['filtered/*.vcf']))
+    filteredList = write_list(os.path.join(scaleDir, 'filtered.txt'),
+                              sorted(glob.glob(os.path.join(scaleDir, 'filtered', '*.vcf'))))
+    flagFile = os.path.join(folder(scaleDir, 'merged'), 'indel_flagged_SNVs.txt')
+    results.append(run_script(scaleDir, src('Somatypus_IndelFlag.py'), [splitList, flagFile], splitVcfs,
+                              ['merged/indel_flagged_SNVs.txt'], baseline=[[splitList, flagFile]]))
+    results.append(run_script(scaleDir, src('Somatypus_SNVmerge.py'), [filteredList, flagFile, folder(scaleDir, 'merged')],
+                              sorted(glob.glob(os.path.join(scaleDir, 'filtered', '*.vcf'))),
+                              ['merged/*SNVs_allele?.*'],
+                              baseline=[[filteredList, flagFile, folder(scaleDir, 'merged')]], ordered=False))
+    results.append(run_script(scaleDir, src('Somatypus_IndelMerge.py'), [unsplitList, folder(scaleDir, 'merged')], vcfs,
+                              ['merged/MergedIndels.*'], baseline=[[unsplitList, folder(scaleDir, 'merged')]],
+                              ordered=False))
+
+    # Steps 3-7, in a single pass
+    results.append(run_script(scaleDir, src('Somatypus_SplitFlagMerge.py'), [unsplitList, folder(scaleDir, 'stream')],
+                              vcfs, ['stream/*']))
+    merged = os.path.join(scaleDir, 'merged')
+    mergedVcfs = [os.path.join(merged, 'MergedSNVs_allele%d.vcf' % i) for i in (1, 2, 3)] + \
+                 [os.path.join(merged, 'MergedIndels.vcf')]
+
+    # Step 8: variant windows (as done with -w), regions and shards
+    windows = os.path.join(folder(scaleDir, 'windows'), 'variant_regions_200bp.txt')
+    sites = []
+    with open(windows, 'w') as out:
+        for vcfFile in mergedVcfs:
+            with open(vcfFile, 'r') as vcf:
+                for line in vcf:
+                    chrom, pos = line.split('\t', 2)[:2]
+                    out.write('%s:%d-%d\n' % (chrom, max(0, int(pos) - 200), int(pos) + 200))
+                    sites.append((chrom, int(pos)))
+    results.append(run_script(scaleDir, src('Somatypus_MergeRegions.py'), [windows], [windows],
+                              ['windows/variant_regions_200bp_merged.txt']))
+    results.append(run_script(scaleDir, src('Somatypus_MergeRegions.py'),
+                              [windows, os.path.join(scaleDir, 'windows', 'variant_regions_200bp_merged.bed')], [windows],
+                              ['windows/variant_regions_200bp_merged.bed'], 'Somatypus_MergeRegions.py bed'))
+    results.append(run_script(scaleDir, src('Somatypus_VariantWindows.py'),
+                              ['200', os.path.join(scaleDir, 'windows', 'variant_windows_200bp.txt')] + mergedVcfs,
+                              mergedVcfs, ['windows/variant_windows_200bp.txt']))
+    regionsFile = os.path.join(scaleDir, 'regions.txt')
+    make_regions(regionsFile, sites, nRegions)
+    results.append(run_script(scaleDir, src('Somatypus_ExtractRegions.py'),
+                              [regionsFile] + mergedVcfs + [folder(scaleDir, 'regions'), '0'],
+                              [regionsFile] + mergedVcfs, ['regions/regions_*.txt'],
+                              baseline=[[regionsFile] + mergedVcfs + [folder(scaleDir, 'regions'), '0']]))
+    results.append(run_script(scaleDir, src('Somatypus_ExtractRegions.py'),
+                              [regionsFile] + mergedVcfs + [folder(scaleDir, 'subregions'), '0', '50'],
+                              [regionsFile] + mergedVcfs, ['subregions/regions_*.txt'], 'Somatypus_ExtractRegions.py padded'))
+    results.append(run_script(scaleDir, src('Somatypus_SparseRegions.py'),
+                              [faiFile, '200', mergedVcfs[1], os.path.join(folder(scaleDir, 'sparse'), 'regions_allele2_sparse.txt')],
+                              [mergedVcfs[1]], ['sparse/regions_allele2_sparse.txt']))
+    results.append(run_script(scaleDir, src('Somatypus_ShardRegions.py'),
+                              [faiFile, os.path.join(scaleDir, 'regions', 'regions_allele1.txt'), mergedVcfs[0], '8',
+                               os.path.join(folder(scaleDir, 'shards'), 'regions')],
+                              [mergedVcfs[0]], ['shards/regions_shard*.txt']))
+
+    # Steps 9-16: synthetic genotyped VCFs
+    samples = ['sample%03d' % (i + 1) for i in range(nSamples)]
+    geno = folder(scaleDir, 'genotyped')
+    genotyped = []
+    for i in (1, 2, 3):
+        genotyped.append(genotype(mergedVcfs[i - 1], samples, os.path.join(geno, 'GenotypedSNVs_allele%d_first.vcf' % i), i))
+    excluded = genotype(os.path.join(merged, 'IndelExcludedSNVs_allele1.vcf'), samples,
+                        os.path.join(geno, 'GenotypedSNVs_indelExcluded_merged.filtered.vcf'), 4)
+    indels = genotype(mergedVcfs[3], samples, os.path.join(geno, 'GenotypedIndels_first.vcf'), 5)
+
+    # Missing calls after the first genotyping (with a twentieth of the variants not genotyped)
+    missing = folder(scaleDir, 'missing')
+    for i, name, merge in ((1, 'allele1', 'no'), (4, 'indels', 'yes')):
+        partial = genotype(mergedVcfs[i - 1], samples, os.path.join(missing, 'Genotyped_%s_first.vcf' % name), 8 + i, 0.05)
+        results.append(run_script(scaleDir, src('Somatypus_MissingCalls.py'),
+                                  [mergedVcfs[i - 1], partial, os.path.join(missing, 'varRegions_%s.txt' % name), merge],
+                                  [mergedVcfs[i - 1], partial], ['missing/varRegions_%s.txt' % name],
+                                  'Somatypus_MissingCalls.py ' + name))
+
+    # Batched genotyping of the missing calls (as done with -b), with synthetic genotyped batches
+    sources = os.path.join(missing, 'sources.txt')
+    with open(sources, 'w') as out:
+        for i, name in ((1, 'allele1'), (4, 'indels')):
+            out.write('\t'.join([os.path.join(missing, 'varRegions_%s.txt' % name), mergedVcfs[i - 1],
+                                 os.path.join(missing, 'Genotyped_%s_second.vcf' % name)]) + '\n')
+    for path in glob.glob(os.path.join(missing, '*batch*')):
+        os.remove(path)
+    results.append(run_script(scaleDir, src('Somatypus_SecondPass.py'), ['split', sources, missing],
+                              [mergedVcfs[0], mergedVcfs[3]], ['missing/varRegions_batch*.txt', 'missing/batch*.sorted.vcf.gz'],
+                              'Somatypus_SecondPass.py split'))
+    for batch in sorted(glob.glob(os.path.join(missing, 'batch*.sorted.vcf.gz'))):
+        n = os.path.basename(batch)[5:-14]
+        with gzip.open(batch, 'rb') as f, open(batch[:-7], 'w') as out:
+            shutil.copyfileobj(f, out)
+        genotype(batch[:-7], samples, os.path.join(missing, 'GenotypedMissing_batch%s.vcf' % n), 10 + int(n))
+    results.append(run_script(scaleDir, src('Somatypus_SecondPass.py'), ['join', sources, missing],
+                              glob.glob(os.path.join(missing, 'GenotypedMissing_batch*.vcf')),
+                              ['missing/Genotyped_*_second.vcf'], 'Somatypus_SecondPass.py join'))
+
+    # Step 17, step 18 and the VAF filter used before step 18 was a single pass
+    results.append(run_script(scaleDir, src('Somatypus_IndelRescuedFilter.py'), [excluded], [excluded],
+                              ['genotyped/*.VAFfilt.vcf'], baseline=[[excluded]]))
+    vafInput = os.path.join(folder(scaleDir, 'vaf'), 'GenotypedSNVs_allele1.vcf')
+    shutil.copy(genotyped[0], vafInput)
+    results.append(run_script(scaleDir, src('Somatypus_VAFfilter.py'), [vafInput], [vafInput], ['vaf/*.VAFfilt.vcf'],
+                              baseline=[[vafInput]]))
+    finalInputs = genotyped + [excluded[:-4] + '.VAFfilt.vcf']
+    results.append(run_script(scaleDir, src('Somatypus_FinalFilter.py'),
+                              [os.path.join(folder(scaleDir, 'final'), 'Somatypus_SNVs_final.vcf')] + finalInputs,
+                              finalInputs, ['final/Somatypus_SNVs_final.vcf']))
+
+    # Incremental runs: the first half of the samples is the previous run
+    half = max(1, nSamples // 2)
+    previous = folder(scaleDir, 'previous')
+    run_measured([src('Somatypus_SplitFlagMerge.py'), write_list(os.path.join(previous, 'list.txt'), vcfs[:half]), previous])
+    results.append(run_script(scaleDir, src('Somatypus_SplitNewVariants.py'), [previous, merged, folder(scaleDir, 'increment')],
+                              mergedVcfs[:3], ['increment/*_variants/*.vcf']))
+    join = folder(scaleDir, 'join')
+    previousList = write_list(os.path.join(join, 'previous.txt'),
+                              [genotype(mergedVcfs[0], samples[:half], os.path.join(join, 'previous.vcf'), 6)])
+    newList = write_list(os.path.join(join, 'new.txt'),
+                         [genotype(mergedVcfs[0], samples[half:] or ['new001'], os.path.join(join, 'new.vcf'), 7)])
+    results.append(run_script(scaleDir, src('Somatypus_JoinGenotypes.py'),
+                              [previousList, newList, 'none', os.path.join(join, 'joined.vcf')],
+                              [os.path.join(join, 'previous.vcf'), os.path.join(join, 'new.vcf')], ['join/joined.vcf']))
+
+    # Compression, checkpoint manifest and data extraction
+    # (the input of Somatypus_Compress.py is removed once compressed)
+    compressInput = os.path.join(folder(scaleDir, 'compress'), 'GenotypedIndels_first.vcf')
+    shutil.copy(indels, compressInput)
+    results.append(run_script(scaleDir, src('Somatypus_Compress.py'), [compressInput], [indels], ['compress/*.gz']))
+    manifest = os.path.join(folder(scaleDir, 'manifest'), 'MANIFEST')
+    if os.path.exists(manifest):
+        os.remove(manifest)
+    result = run_script(scaleDir, src('Somatypus_Manifest.py'), ['record', manifest, '9', 'none'] + genotyped,
+                        genotyped, [])
+    result['hashes'] = None
+    results.append(result)
+    extractInput = os.path.join(folder(scaleDir, 'extract'), 'GenotypedSNVs_allele1.vcf')
+    shutil.copy(genotyped[0], extractInput)
+    results.append(run_script(scaleDir, os.path.join(UTILS, 'ExtractVcfData.py'), [extractInput], [extractInput],
+                              ['extract/*.txt'], baseline=[[extractInput]]))
+    extractInput = os.path.join(folder(scaleDir, 'extract_npy'), 'GenotypedSNVs_allele1.vcf')
+    shutil.copy(genotyped[0], extractInput)
+    results.append(run_script(scaleDir, os.path.join(UTILS, 'ExtractVcfData.py'), [extractInput, 'npy'], [extractInput],
+                              ['extract_npy/*.txt', 'extract_npy/*.npy'], 'ExtractVcfData.py npy'))
+    return results
+
+
+# Compare the output hashes of a script with those in the fixtures
+# (or, with --record, with those of its baseline version)
+def check(scale, result):
+    if result['hashes'] is None:
+        return '-'
+    if options.record:
+        if result['baseline'] is None:
+            return '-'
+        baseline = result['baseline']
+        return 'ok' if all(result['hashes'].get(path) == baseline[path] for path in baseline) else 'DIFFERS'
+    expected = fixtures.get(scale, {}).get('scripts', {}).get(result['script'])
+    if expected is None:
+        return 'no fixture'
+    return 'ok' if expected == result['hashes'] else 'DIFFERS'
+
+
+failed = False
+with open(os.path.join(folder(workDir, ''), 'results.tsv'), 'w') as out:
+    out.write('scale\tscript\twall_s\tcpu_s\tpeak_rss_mb\tinput_records\trecords_per_s\tfixture\n')
+    for scale in scales:
+        nSamples, nSites = [int(x) for x in scale.split('x')]
+        scaleDir = os.path.join(workDir, scale)
+        nRegions = options.regions
+        if options.check and scale in fixtures:
+            nRegions = fixtures[scale]['regions']
+        if os.path.isdir(scaleDir):
+            shutil.rmtree(scaleDir)
+        print '\nScale %s: %d samples, %d variant sites, %d regions' % (scale, nSamples, nSites, nRegions)
+        print '%-34s %10s %10s %10s %12s %14s   %s' % ('Script', 'Wall (s)', 'CPU (s)', 'RSS (MB)', 'Records',
+                                                     'Records/s', 'Baseline' if options.record else
+                                                     'Fixture' if options.check else '')
+        results = run_scale(scaleDir, nSamples, nSites, nRegions)
+        for result in results:
+            status = check(scale, result) if options.check or options.record else ''
+            failed = failed or status in ('DIFFERS', 'no fixture')
+            rate = result['records'] / result['wall'] if result['wall'] > 0 else 0
+            print '%-34s %10.2f %10.2f %10.1f %12d %14.0f   %s' % (result['script'], result['wall'], result['cpu'],
+                                                               result['rss'], result['records'], rate, status)
+            out.write('%s\t%s\t%.3f\t%.3f\t%.1f\t%d\t%.0f\t%s\n' % (scale, result['script'], result['wall'], result['cpu'],
+                                                                   result['rss'], result['records'], rate, status or '-'))
+        if options.record:
+            fixtures[scale] = {'regions': nRegions,
+                               'scripts': dict((result['script'], dict(result['hashes'], **(result['baseline'] or {})))
+                                               for result in results if result['hashes'] is not None)}
+
+if options.record:
+    with open(options.fixtures, 'w') as f:
+        json.dump(fixtures, f, indent=1, sort_keys=True, separators=(',', ': '))
+        f.write('\n')
+    print '\nOutput hashes written to', options.fixtures
+
+print '\nResults written to', os.path.join(workDir, 'results.tsv')
+if failed:
+    print '\nERROR: Some outputs differ from the %s (see the %s column)\n' % \
+          (('baseline scripts', 'Baseline') if options.record else ('fixtures', 'Fixture'))
+    sys.exit(1)
+print 'Done\n'
@@ -0,0 +1,248 @@
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# benchlib.py
+# Synthetic Platypus data and measurement functions shared by the benchmarks
+
+
+"""
+Functions for writing synthetic Platypus-like VCFs (48 header lines, 20 INFO fields in the
+order output by Platypus, and GT:GL:GOF:GQ:NR:NV sample fields), region files and FASTA
+indexes, and for running a script while measuring its wall time, CPU time and peak memory.
+"""
+
+
+import os
+import gzip
+import hashlib
+import random
+import subprocess
+import sys
+import time
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, '..', 'src')
+UTILS = os.path.join(HERE, '..', 'utils')
+REFERENCE = os.path.join(HERE, 'reference')
+
+# Chromosome names and lengths (bp) of the synthetic genome
+CHROMS = [(str(i), (250 - 9 * i) * 1000000) for i in range(1, 23)] + [('X', 155000000)]
+
+BASES = 'ACGT'
+INFO_KEYS = ['BRF', 'FR', 'HP', 'HapScore', 'MGOF', 'MMLQ', 'MQ', 'NF', 'NR', 'PP', 'QD', 'SC',
+             'SbPval', 'Source', 'TC', 'TCF', 'TCR', 'TR', 'WE', 'WS']
+FORMAT = 'GT:GL:GOF:GQ:NR:NV'
+
+
+def header(samples):
+    """Returns the 48 header lines of a Platypus VCF for the given sample names."""
+    lines = ['##fileformat=VCFv4.1',
+             '##fileDate=2016-01-22',
+             '##source=Platypus_Version_0.8.1']
+    for key in INFO_KEYS:
+        lines.append('##INFO=<ID=%s,Number=.,Type=String,Description="%s">' % (key, key))
+    for key in ['GQ', 'GL', 'GOF', 'GT', 'NR', 'NV']:
+        lines.append('##FORMAT=<ID=%s,Number=.,Type=String,Description="%s">' % (key, key))
+    for key in ['QD', 'badReads', 'SC', 'alleleBias', 'Q20', 'HapScore', 'MQ', 'strandBias',
+                'REFCALL', 'QualDepth', 'hp10', 'GOF']:
+        lines.append('##FILTER=<ID=%s,Description="%s">' % (key, key))
+    while len(lines) < 47:
+        lines.append('##platypusOptions={}')
+    lines.append('\t'.join(['#CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO', 'FORMAT'] + samples))
+    return '\n'.join(lines) + '\n'
+
+
+def sample_field(rand, nAlts, present=True):
+    """Returns a GT:GL:GOF:GQ:NR:NV sample field with one NR/NV value per ALT allele."""
+    nr = rand.randint(5, 80)
+    nvs = [rand.randint(3, nr) if present else 0 for i in range(nAlts)]
+    gl = ','.join(['-%.2f' % rand.uniform(0, 50)] * 3)
+    return '%s:%s:%d:%d:%s:%s' % ('0/1' if present else '0/0', gl, rand.randint(0, 10), rand.randint(1, 99),
+                                   ','.join([str(nr)] * nAlts), ','.join(str(nv) for nv in nvs))
+
+
+def record(rand, chrom, pos, ref, alts, samples, filters='PASS'):
+    """Returns a Platypus VCF record line; samples is a list of booleans (variant present)."""
+    n = len(alts)
+    values = {'FR': ','.join(['0.5'] * n), 'NF': ','.join(['3'] * n), 'NR': ','.join(['2'] * n),
+              'PP': ','.join(['100'] * n), 'TR': ','.join(['5'] * n), 'HP': '1', 'Source': 'Platypus',
+              'TC': '40', 'MQ': '60.0', 'QD': '20.0', 'SC': 'ACGTACGTACGTACGTACGTA', 'WE': str(pos + 10),
+              'WS': str(pos - 10)}
+    info = ';'.join('%s=%s' % (key, values.get(key, '0.5')) for key in INFO_KEYS)
+    fields = [sample_field(rand, n, present) for present in samples]
+    return '\t'.join([chrom, str(pos), '.', ref, ','.join(alts), str(rand.randint(20, 3000)), filters,
+                      info, FORMAT] + fields) + '\n'
+
+
+def random_variant(rand, kind):
+    """Returns (ref, alts) for a variant of kind 'snv', 'ma', 'mnp', 'ins' or 'del'."""
+    ref = rand.choice(BASES)
+    others = [b for b in BASES if b != ref]
+    if kind == 'snv':
+        return ref, [rand.choice(others)]
+    if kind == 'ma':
+        return ref, rand.sample(others, rand.randint(2, 3))
+    if kind == 'mnp':
+        length = rand.randint(2, 4)
+        ref = ''.join(rand.choice(BASES) for i in range(length))
+        alt = ''.join(rand.choice([b for b in BASES if b != r]) for r in ref)
+        return ref, [alt]
+    if kind == 'ins':
+        return ref, [ref + ''.join(rand.choice(BASES) for i in range(rand.randint(1, 6)))]
+    return ref + ''.join(rand.choice(BASES) for i in range(rand.randint(1, 6))), [ref]
+
+
+def make_sites(rand, nSites, fractions):
+    """Returns (chrom, pos, ref, alts) sites in coordinate order; fractions maps variant kinds
+    to proportions. A third of the indels get an SNV within 5 bp after them, so that some
+    SNVs are indel-flagged."""
+    total = sum(length for chrom, length in CHROMS)
+    sites = []
+    kinds = sorted(fractions)
+    for chrom, length in CHROMS:
+        n = nSites * length // total
+        for pos in sorted(rand.sample(xrange(100, length - 100, 20), n)):
+            x = rand.random()
+            kind = kinds[-1]
+            for k in kinds:
+                if x < fractions[k]:
+                    kind = k
+                    break
+                x = x - fractions[k]
+            ref, alts = random_variant(rand, kind)
+            sites.append((chrom, pos, ref, alts))
+            if kind in ('ins', 'del') and rand.random() < 0.33:
+                snvRef, snvAlts = random_variant(rand, 'snv')
+                sites.append((chrom, pos + rand.randint(1, 5), snvRef, snvAlts))
+    return sites
+
+
+def make_cohort(outDir, nSamples, nSites, fractions=None, presence=0.3, seed=1):
+    """Writes one single-sample Platypus-like VCF per sample into outDir, each containing a
+    random subset of a shared set of sites, and returns the list of VCF paths."""
+    if fractions is None:
+        fractions = {'snv': 0.84, 'ma': 0.03, 'mnp': 0.03, 'ins': 0.05, 'del': 0.05}
+    rand = random.Random(seed)
+    if not os.path.isdir(outDir):
+        os.makedirs(outDir)
+    sites = make_sites(rand, nSites, fractions)
+    paths = []
+    for i in range(nSamples):
+        name = 'sample%03d' % (i + 1)
+        path = os.path.join(outDir, 'platypusVariants_%s_default.vcf' % name)
+        with open(path, 'w') as out:
+            out.write(header([name]))
+            for chrom, pos, ref, alts in sites:
+                if rand.random() < presence:
+                    filters = 'PASS' if rand.random() < 0.8 else rand.choice(['badReads', 'MQ', 'QD', 'alleleBias'])
+                    out.write(record(rand, chrom, pos, ref, alts, [True], filters))
+        paths.append(path)
+    return paths
+
+
+def make_regions(path, sites, nRegions, seed=1):
+    """Writes an exome-like regions file (CHR:START-END, 80-400 bp) to path, with about two
+    thirds of the regions around variant sites and the rest anywhere in the genome, and
+    returns the number of regions."""
+    rand = random.Random(seed)
+    total = sum(length for chrom, length in CHROMS)
+    regions = []
+    for i in xrange(nRegions):
+        if i % 3 and sites:
+            chrom, pos = rand.choice(sites)[:2]
+            start = max(1, pos - rand.randint(0, 300))
+        else:
+            chrom, length = rand.choice(CHROMS)
+            start = rand.randint(1, length - 1000)
+        regions.append((chrom, start, start + rand.randint(80, 400)))
+    order = dict((chrom, i) for i, (chrom, length) in enumerate(CHROMS))
+    regions.sort(key=lambda r: (order[r[0]], r[1]))
+    with open(path, 'w') as out:
+        for chrom, start, end in regions:
+            out.write('%s:%d-%d\n' % (chrom, start, end))
+    return len(regions)
+
+
+def write_fai(path):
+    """Writes a FASTA index (.fai) of the synthetic genome to path."""
+    offset = 0
+    with open(path, 'w') as out:
+        for chrom, length in CHROMS:
+            offset = offset + len(chrom) + 2
+            out.write('%s\t%d\t%d\t60\t61\n' % (chrom, length, offset))
+            offset = offset + length + length // 60
+    return path
+
+
+def genotype(mergedFile, samples, outFile, seed=1, missing=0.0):
+    """Writes a synthetic genotyped VCF to outFile, as written by Platypus when genotyping the
+    variants in a merged VCF in the given samples: every variant is reported in all the
+    samples (a tenth of them present in all, at high VAF), and some are flagged. A fraction
+    'missing' of the variants is left out, as Platypus does with some of them."""
+    rand = random.Random(seed)
+    with open(mergedFile, 'r') as merged, open(outFile, 'w') as out:
+        out.write(header(samples))
+        for line in merged:
+            if line.startswith('#'):
+                continue
+            if missing and rand.random() < missing:
+                continue
+            col = line.split('\t', 5)
+            presence = 1.0 if rand.random() < 0.1 else rand.uniform(0.05, 0.8)
+            filters = 'PASS' if rand.random() < 0.85 else rand.choice(['badReads', 'MQ', 'QD', 'alleleBias'])
+            out.write(record(rand, col[0], int(col[1]), col[3], col[4].split(','),
+                             [rand.random() < presence for s in samples], filters))
+    return outFile
+
+
+def count_records(path):
+    """Returns the number of non-header lines in a (possibly compressed) text file."""
+    opener = gzip.open if path.endswith('.gz') else open
+    count = 0
+    with opener(path, 'rb') as f:
+        for line in f:
+            if not line.startswith('#'):
+                count = count + 1
+    return count
+
+
+def digest(path, ordered=True):
+    """Returns the MD5 hash of the content of a file (decompressed, for BGZF/gzip files and
+    tabix indexes, so that it does not depend on the zlib version). If ordered is False, the
+    lines are sorted before hashing, so that the hash does not depend on their order."""
+    opener = gzip.open if path.endswith('.gz') or path.endswith('.tbi') else open
+    md5 = hashlib.md5()
+    with opener(path, 'rb') as f:
+        if ordered:
+            for block in iter(lambda: f.read(1 << 20), ''):
+                md5.update(block)
+        else:
+            for line in sorted(f):
+                md5.update(line)
+    return md5.hexdigest()
+
+
+def write_list(path, items):
+    with open(path, 'w') as out:
+        for item in items:
+            out.write(item + '\n')
+    return path
+
+
+def run_measured(args, logFile=os.devnull):
+    """Runs a Python script with the current interpreter, and returns its wall time (s),
+    CPU time (s) and peak resident memory (MB). Standard output is written to logFile."""
+    with open(logFile, 'w') as log:
+        start = time.time()
+        process = subprocess.Popen([sys.executable] + args, stdout=log)
+        pid, status, usage = os.wait4(process.pid, 0)
+        wall = time.time() - start
+    if status != 0:
+        raise RuntimeError('Command failed: ' + ' '.join(args))
+    return wall, usage.ru_utime + usage.ru_stime, usage.ru_maxrss / 1024.0
+
+
+def same_files(path1, path2):
+    with open(path1, 'rb') as f1, open(path2, 'rb') as f2:
+        return f1.read() == f2.read()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_Compress.py
+# Compresses a VCF file (or standard input) in BGZF format
+# Called by call_sample(), genotyping(), genotyping_indelflagged() and merge_filter_indelflagged()
+
+# INPUT
+# vcfFile: path to VCF file, or '-' to read from standard input
+# outFile: path to output compressed VCF file (optional; default: vcfFile + '.gz')
+
+
+"""
+This script is used to compress the intermediate VCF files of the pipeline in BGZF format
+(as done by 'bgzip'), when Somatypus is run with the -z option. The blocks are compressed
+by SOMATYPUS_THREADS threads. When an input file is given, it is removed once the
+compressed file has been written.
+"""
+
+
+import sys
+import os
+from somatypuslib.bgzf import BgzfWriter
+
+
+# Size of the chunks read from the input (bytes)
+CHUNKSIZE = 1 << 20
+
+
+# If not 1 or 2 arguments (or no output path for standard input): print help
+if len(sys.argv) not in (2, 3) or (sys.argv[1] == '-' and len(sys.argv) != 3):
+    print '\nSomatypus_Compress.py: Compresses a VCF file in BGZF format, removing the uncompressed file.'
+    print '                Input: Path to VCF file, or - to read from standard input.'
+    print '                       Path to output file (optional if a VCF file is given; default: /path/to/variants.vcf.gz).'
+    print '                Usage: Somatypus_Compress.py /path/to/variants.vcf [/path/to/output.vcf.gz]\n'
+    sys.exit(0)
+
+
+vcfFile = sys.argv[1]
+outFile = sys.argv[2] if len(sys.argv) == 3 else vcfFile + '.gz'
+
+
+# Copy the input into the BGZF writer
+input = sys.stdin if vcfFile == '-' else open(vcfFile, 'rb')
+with BgzfWriter(outFile) as out:
+    while True:
+        data = input.read(CHUNKSIZE)
+        if not data:
+            break
+        out.write(data)
+input.close()
+
+if vcfFile != '-':
+    os.remove(vcfFile)
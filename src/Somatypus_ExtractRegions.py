@@ -16,6 +16,7 @@
 # indelsVCF: path to VCF with indels (or "none")
 # outDir: path to (existing) output folder
 # excluded: logical value indicating if the variants are indel-excluded SNVs (1) or not (0)
+# padding: if given, size (bp) of the sub-regions at each side of the variants (optional)
 
 
 """
@@ -23,34 +24,47 @@ This script is used to extract the regions from a regions file that contain vari
 different VCF files, corresponding to: bi-allelic variants / 1st allele of multi-allelic variants;
 2nd allele of multi-allelic variants; 3rd allele of multi-allelic variants; and indels (or blank). 
 The regions are consequently output to four different files, according to the alleles they contain.
+If a padding is given, each region is not output whole, but as the sub-regions of +/-padding bp
+around the variants of each file that it contains (clipped to the region, and merged where they
+overlap or are adjacent), so that Platypus only reads the bases around the variants.
 """
 
 
 import sys
 import os
 import re
+from somatypuslib.regions import read_regions, read_vcf_positions, format_region
+from somatypuslib.telemetry import record_counts
 
 
-# If not 7 arguments: print help
-if len(sys.argv) != 8:
+# If not 7 or 8 arguments: print help
+if len(sys.argv) not in (8, 9) or (len(sys.argv) == 9 and not sys.argv[8].isdigit()):
     print '\nSomatypus_ExtractRegions.py: Extracts regions from a regions file, if they contain variants from the VCFs.'
     print '                             The 4 VCF files correspond to: bi-allelic SNVs / 1st allele of'
     print '                             multi-allelic SNVs; 2nd allele of multi-allelic SNVs; 3rd allele of'
     print '                             multi-allelic SNVs; and indels (if "none", this will not be used).'
     print '                             The regions are output to 4 different files, one for each input VCF.'
+    print '                             If a padding is given, only the sub-regions of +/-padding bp around the'
+    print '                             variants in each region are output (clipped to the region and merged).'
     print '                      Input: A file with the original regions in CHR:START-END format, one per line.'
     print '                             Four VCF files.'
     print '                             Path to (existing) output folder.'
     print '                             Logical value indicating if the variants are indel-excluded SNVs (1) or not (0).'
-    print '                      Usage: Somatypus_ExtractRegions.py /path/to/regions.txt /path/to/var1.vcf /path/to/var2.vcf /path/to/var3.vcf </path/to/var4.vcf|"none"> /path/to/outDir <0/1>\n'
+    print '                             Padding, in bp (optional).'
+    print '                      Usage: Somatypus_ExtractRegions.py /path/to/regions.txt /path/to/var1.vcf /path/to/var2.vcf /path/to/var3.vcf </path/to/var4.vcf|"none"> /path/to/outDir <0/1> [padding]\n'
     sys.exit(0)
 
 
-script, exomeFile, allele1VCF, allele2VCF, allele3VCF, indelsVCF, outDir, excluded = sys.argv
+script, exomeFile, allele1VCF, allele2VCF, allele3VCF, indelsVCF, outDir, excluded = sys.argv[:8]
+padding = None
+if len(sys.argv) == 9:
+    padding = int(sys.argv[8])
 
 
 # Compose paths to output region files
 print '\nExome regions file:', exomeFile
+if padding is not None:
+    print 'Sub-regions of +/-' + str(padding) + ' bp around the variants'
 outFileInd = outDir + '/regions_indels.txt'
 if int(excluded) == 0:
     outFile1 = outDir + '/regions_allele1.txt'
@@ -62,124 +76,83 @@ else:
     outFile3 = outDir + '/regions_allele3_indelExcluded.txt'
 
 
-# Variables for counting and storing selected regions (exons)
+# Variables for counting selected regions (exons) and their bases
 count1 = 0
 count2 = 0
 count3 = 0
 countInd = 0
 countExon = 0
-allele1 = {}
-allele2 = {}
-allele3 = {}
-indels = {}
+bases = {1: 0, 2: 0, 3: 0, 'indels': 0}
 
 
-# Read positions into dictionaries
+# Read positions into per-chromosome sorted indices
 print '\nReading file:', allele1VCF
-with open(allele1VCF, 'r') as vcf:
-    for line in vcf:
-        if not line.startswith('#'):
-            col = line.strip().split('\t')
-            chr = col[0]
-            pos = int(col[1])
-            if chr in allele1:
-                allele1[chr].append(pos)
-            else:
-                allele1[chr] = [pos]
-
+allele1 = read_vcf_positions(allele1VCF)
 print 'Reading file:', allele2VCF
-with open(allele2VCF, 'r') as vcf:
-    for line in vcf:
-        if not line.startswith('#'):
-            col = line.strip().split('\t')
-            chr = col[0]
-            pos = int(col[1])
-            if chr in allele2:
-                allele2[chr].append(pos)
-            else:
-                allele2[chr] = [pos]
-
+allele2 = read_vcf_positions(allele2VCF)
 print 'Reading file:', allele3VCF
-with open(allele3VCF, 'r') as vcf:
-    for line in vcf:
-        if not line.startswith('#'):
-            col = line.strip().split('\t')
-            chrom = col[0]
-            pos = int(col[1])
-            if chrom in allele3:
-                allele3[chrom].append(pos)
-            else:
-                allele3[chrom] = [pos]
-
+allele3 = read_vcf_positions(allele3VCF)
 if indelsVCF != 'none':
     print 'Reading file:', indelsVCF, '\n'
-    with open(indelsVCF, 'r') as vcf:
-        for line in vcf:
-            if not line.startswith('#'):
-                col = line.strip().split('\t')
-                chr = col[0]
-                pos = int(col[1])
-                if chr in indels:
-                    indels[chr].append(pos)
-                else:
-                    indels[chr] = [pos]
+    indels = read_vcf_positions(indelsVCF)
+
+
+# Writes a region containing variants to an output file (whole, or as the sub-regions around
+# its variants if a padding is given), and returns the number of regions written
+def write_region(out, index, key, exon, chrom, start, end):
+    if padding is None:
+        out.write(exon)
+        bases[key] = bases[key] + end - start + 1
+        return 1
+    written = 0
+    for windowStart, windowEnd in index.windows(chrom, start, end, padding):
+        out.write(format_region(chrom, windowStart, windowEnd))
+        bases[key] = bases[key] + windowEnd - windowStart + 1
+        written = written + 1
+    return written
 
 
 # Process regions and check if they contain variants
-with open(exomeFile, 'r') as exome, \
-     open(outFile1, 'w') as out1, open(outFile2, 'w') as out2, open(outFile3, 'w') as out3, \
+# (each check is a binary search on the sorted positions of the region's chromosome;
+# without indels, the indels regions file is not opened, as it may be in use by another step)
+if indelsVCF == 'none':
+    outFileInd = os.devnull
+with open(outFile1, 'w') as out1, open(outFile2, 'w') as out2, open(outFile3, 'w') as out3, \
      open(outFileInd, 'w') as outInd:
     
-    for exon in exome:
+    for exon, chrom, start, end in read_regions(exomeFile):
         print 'Processing region', exon.strip()
         countExon = countExon + 1
-        exonComp = exon.strip().split(':')
-        chrom = exonComp[0]
-        start = int(exonComp[1].split('-')[0])
-        end = int(exonComp[1].split('-')[1])
         
-        # For positions in each allele dict: add exon to output file if it contains any position
-        if chrom in allele1:
-            for pos in allele1[chrom]:
-                if start <= pos and end >= pos:
-                    out1.write(exon)
-                    count1 = count1 + 1
-                    print ' Found in Allele 1 VCF'
-                    break
+        # For each allele index: add exon to output file if it contains any position
+        if allele1.overlaps(chrom, start, end):
+            count1 = count1 + write_region(out1, allele1, 1, exon, chrom, start, end)
+            print ' Found in Allele 1 VCF'
     
-        if chrom in allele2:
-            for pos in allele2[chrom]:
-                if start <= pos and end >= pos:
-                    out2.write(exon)
-                    count2 = count2 + 1
-                    print ' Found in Allele 2 VCF'
-                    break
+        if allele2.overlaps(chrom, start, end):
+            count2 = count2 + write_region(out2, allele2, 2, exon, chrom, start, end)
+            print ' Found in Allele 2 VCF'
         
-        if chrom in allele3:
-            for pos in allele3[chrom]:
-                if start <= pos and end >= pos:
-                    out3.write(exon)
-                    count3 = count3 + 1
-                    print ' Found in Allele 3 VCF'
-                    break
+        if allele3.overlaps(chrom, start, end):
+            count3 = count3 + write_region(out3, allele3, 3, exon, chrom, start, end)
+            print ' Found in Allele 3 VCF'
         
-        # If indels file input: search indels dict
+        # If indels file input: search indels index
         if indelsVCF != 'none':
-            if chrom in indels:
-                for pos in indels[chrom]:
-                    if start <= pos and end >= pos:
-                        outInd.write(exon)
-                        countInd = countInd + 1
-                        print ' Found in Indels VCF'
-                        break
+            if indels.overlaps(chrom, start, end):
+                countInd = countInd + write_region(outInd, indels, 'indels', exon, chrom, start, end)
+                print ' Found in Indels VCF'
 
 
 print '\n', countExon, 'regions processed'
-print count1, 'regions output to file', outFile1
-print count2, 'regions output to file', outFile2
-print count3, 'regions output to file', outFile3
+print count1, 'regions output to file', outFile1, '(' + str(bases[1]) + ' bp)'
+print count2, 'regions output to file', outFile2, '(' + str(bases[2]) + ' bp)'
+print count3, 'regions output to file', outFile3, '(' + str(bases[3]) + ' bp)'
 if indelsVCF != 'none':
-    print countInd, 'regions output to file', outFileInd
+    print countInd, 'regions output to file', outFileInd, '(' + str(bases['indels']) + ' bp)'
 else:
     print 'Indels not considered'
+record_counts(regions_read=countExon, regions_allele1=count1, regions_allele2=count2, regions_allele3=count3,
+              regions_indels=countInd, bases_allele1=bases[1], bases_allele2=bases[2], bases_allele3=bases[3],
+              bases_indels=bases['indels'])
 print '\nDone\n'
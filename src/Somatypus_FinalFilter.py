@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_FinalFilter.py
+# Merges and filters genotyped Platypus VCF files into a sorted final VCF file
+# Called by merge_filter_all()
+
+# INPUT
+# outFile: path to output VCF file
+# vcfFiles: paths to genotyped VCF files (one or more)
+
+
+"""
+This script is used to create the final output VCF from the genotyped Platypus VCFs, in a
+single pass. The input VCFs are merged as coordinate-ordered streams; calls with any of the
+flags badReads, MQ, strandBias, SC, or QD are discarded, as are calls with a VAF (number of
+reads supporting variant / total reads) of more than 0.9 in all the samples. The remaining
+calls are written sorted by chromosome (in natural order) and position, as done by
+'vcf-sort -c', with the header of the first input VCF. The input VCFs must hold the same
+samples, but not necessarily in the same order (as in incremental runs, where the genotypes
+of previous variants are joined to those of the new samples); the sample columns of each
+call are written in the order of the first VCF.
+"""
+
+
+import sys
+import os
+import re
+from somatypuslib.vcf import VcfReader, VcfRecord, open_vcf, merge_sorted, group_by_position, \
+                             sample_names, sample_order, reorder_samples
+from somatypuslib.readcounts import high_vaf, blocks
+from somatypuslib.calls import has_bad_flag
+from somatypuslib.telemetry import record_counts
+
+
+# VAF threshold
+MAXVAF = 0.9
+
+
+# If less than 2 arguments: print help
+if len(sys.argv) < 3:
+    print '\nSomatypus_FinalFilter.py: Merges and filters genotyped Platypus VCF files into a sorted final VCF file.'
+    print '                          *All calls in the VCFs must be biallelic (no commas in the ALT column).*'
+    print '                          Calls with flags badReads, MQ, strandBias, SC or QD, and calls with a VAF >0.9'
+    print '                          in all samples are discarded.'
+    print '                   Input: Path to output VCF file.'
+    print '                          Paths to genotyped VCF files (the header is taken from the first one).'
+    print '                   Usage: Somatypus_FinalFilter.py /path/to/output.vcf /path/to/input1.vcf [/path/to/input2.vcf ...]\n'
+    sys.exit(0)
+
+
+outFile = sys.argv[1]
+vcfFiles = sys.argv[2:]
+
+
+for vcfFile in vcfFiles:
+    print '\nInput file:  ', vcfFile
+print 'Output file: ', outFile
+
+
+# Order of the sample columns of each VCF in the output (None if it is already the same)
+with VcfReader(vcfFiles[0]) as vcf:
+    header = vcf.header
+names = sample_names(header)
+orders = []
+for vcfFile in vcfFiles:
+    with VcfReader(vcfFile) as vcf:
+        fileNames = sample_names(vcf.header)
+    if fileNames == names:
+        orders.append(None)
+    else:
+        try:
+            orders.append(sample_order(fileNames, names))
+        except ValueError:
+            print '\nERROR: ' + vcfFile + ' does not hold the same samples as ' + vcfFiles[0] + '\n'
+            sys.exit(1)
+
+
+# Merge calls in coordinate order (writing calls at the same position in sorted order),
+# and filter calls with flags badReads, MQ, strandBias, SC or QD
+counts = {'read': 0, 'flagged': 0, 'highVaf': 0}
+def unflagged_calls():
+    for group in group_by_position(merge_sorted(vcfFiles)):
+        lines = [rec[5] if orders[rec[2]] is None else reorder_samples(rec[5], orders[rec[2]]) for rec in group]
+        for line in sorted(lines):
+            counts['read'] = counts['read'] + 1
+            if has_bad_flag(VcfRecord(line).filter):
+                counts['flagged'] = counts['flagged'] + 1
+            else:
+                yield line
+
+
+with open_vcf(outFile, 'w') as out:
+    # Header
+    out.writelines(header)
+
+    # Filter calls with a VAF >0.9 in all samples (evaluated in blocks of calls)
+    for block in blocks(unflagged_calls()):
+        for line, discard in zip(block, high_vaf(block, MAXVAF)):
+            if discard:
+                counts['highVaf'] = counts['highVaf'] + 1
+            else:
+                out.write(line)
+
+print '\n' + str(counts['read']) + ' variants read'
+print str(counts['flagged']) + ' flagged variants discarded'
+print str(counts['highVaf']) + ' high-VAF variants discarded'
+record_counts(variants_read=counts['read'], flagged_discarded=counts['flagged'], high_vaf_discarded=counts['highVaf'])
+print 'Done\n'
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_FlagFilter.py
+# Filters calls with flags badReads, MQ, strandBias, SC or QD from multiple Platypus VCF files
+# Called by filter_calls()
+
+# INPUT
+# inputFile: text file with paths to VCF files, one per line
+# outDir: path to (existing) output folder
+
+
+"""
+This script is used to remove the calls showing any of the flags badReads, MQ, strandBias,
+SC or QD from multiple Platypus VCFs (as the awk filter previously used by the pipeline
+did). Each VCF is written to the output folder with extension .filtered.vcf (or
+.filtered.vcf.gz, if the input VCF is compressed). The VCFs are processed by
+SOMATYPUS_PROCESSES processes.
+"""
+
+
+import sys
+import os
+import re
+from itertools import izip
+from somatypuslib.vcf import VcfReader, open_vcf, derived_path
+from somatypuslib.calls import has_bad_flag
+from somatypuslib.parallel import map_tasks
+from somatypuslib.telemetry import record_counts
+
+
+# If not 2 arguments: print help
+if len(sys.argv) != 3:
+    print '\nSomatypus_FlagFilter.py: Filters calls with flags badReads, MQ, strandBias, SC or QD from multiple Platypus VCF files.'
+    print '                         Each filtered VCF is written to the output folder as /path/to/outDir/variants.filtered.vcf'
+    print '                         (compressed if the input VCF is compressed).'
+    print '                  Input: A text file with paths to VCF files (.vcf or .vcf.gz), one per line.'
+    print '                         Path to (existing) output folder.'
+    print '                  Usage: Somatypus_FlagFilter.py /path/to/fileList.txt /path/to/outDir\n'
+    sys.exit(0)
+
+
+script, inputFile, outDir = sys.argv
+
+
+# Read list of VCF files
+with open(inputFile, 'r') as vcfList:
+    vcfFiles = [listLine.strip() for listLine in vcfList if listLine.strip() != '']
+
+
+# Write the calls without flags badReads, MQ, strandBias, SC or QD to the output file
+# Returns the path to the output file and the numbers of calls read and discarded
+def filter_file(vcfFile):
+    outFile = derived_path(os.path.join(outDir, os.path.basename(vcfFile)), '.filtered.vcf')
+    read = 0
+    discarded = 0
+    with VcfReader(vcfFile) as vcf:
+        with open_vcf(outFile, 'w') as out:
+            out.writelines(vcf.header)
+            for line in vcf.lines():
+                read = read + 1
+                # FILTER is the 7th column
+                if has_bad_flag(line.split('\t', 7)[6]):
+                    discarded = discarded + 1
+                else:
+                    out.write(line)
+    return outFile, read, discarded
+
+
+for vcfFile, (outFile, read, discarded) in izip(vcfFiles, map_tasks(filter_file, vcfFiles)):
+    print '\nInput file:  ', vcfFile
+    print 'Output file: ', outFile
+    print read, 'calls read,', discarded, 'calls with flags badReads, MQ, strandBias, SC or QD discarded'
+    record_counts(files=1, calls_read=read, calls_discarded=discarded)
+
+print '\nDone\n'
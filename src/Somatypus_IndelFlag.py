@@ -22,7 +22,10 @@ to an indel in any sample, from multiple Platypus VCFs, and write them into an o
 import sys
 import os
 import re
-from sets import Set
+from somatypuslib.regions import IntervalIndex
+from somatypuslib.vcf import VcfReader
+from somatypuslib.calls import indel_window, variant_id
+from somatypuslib.telemetry import record_counts
 
 
 # If not 2 arguments: print help
@@ -32,69 +35,50 @@ if len(sys.argv) != 3:
     print '                        For each VCF, it extracts the coordinates of the bases up to 5bp'
     print '                        upstream and downstream any indel; then, it detects SNVs inside'
     print '                        these regions in the same sample and outputs them into a text file.'
-    print '                 Input: A text file with paths to VCF files, one per line.'
+    print '                 Input: A text file with paths to VCF files (.vcf or .vcf.gz), one per line.'
     print '                        Path to output file.'
     print '                 Usage: Somatypus_IndelFlag.py /path/to/fileList.txt /path/to/outFile.txt\n'
     sys.exit(0)
 
 
-# Number of bases to exclude at each side of an indel footprint
-WINDOW = 5
-
-
 script, inputFile, outFile = sys.argv
-flaggedSNVs = Set([])
+flaggedSNVs = set()
 
 
-# Extract SNVs near indels from each sample
+# Extract SNVs near indels from each sample, in a single pass through each VCF
 with open(inputFile, 'r') as vcfList:
     for listLine in vcfList:
         vcfFile = listLine.strip()
         print 'Processing file ' + vcfFile
         
-        # First: mark positions covered by indels
-        indelPos = Set([])
-        with open(vcfFile, 'r') as vcf:
-            for line in vcf:
-                if not line.startswith('#'):
-                    col = line.strip().split('\t')
-                    chrom = col[0]
-                    pos = col[1]
-                    ref = col[3]
-                    alt = col[4]
-                    if ',' in alt:
-                        print '\nERROR: Multiallelic variant found at ' + chrom + ':' + pos + '. Use splitMAandMNPs.py first.\n'
+        # Mark the windows covered by indels as intervals, and keep the sample's SNVs
+        indelWindows = IntervalIndex()
+        snvs = []
+        with VcfReader(vcfFile) as vcf:
+            for rec in vcf:
+                chrom = rec.chrom
+                pos = rec.pos
+                ref = rec.ref
+                alt = rec.alt
+                if ',' in alt:
+                    print '\nERROR: Multiallelic variant found at ' + chrom + ':' + pos + '. Use splitMAandMNPs.py first.\n'
+                    sys.exit(1)
+                # If indel, mark a window of WINDOW bp at both flanks of the indel position/footprint
+                if len(ref) != len(alt):
+                    start, end = indel_window(rec)
+                    indelWindows.add(chrom, start, end)
+                # If SNV, keep it for checking against the indel windows
+                else:
+                    if len(ref) != 1:
+                        print '\nERROR: MNP found at ' + chrom + ':' + pos + '. Use splitMAandMNPs.py first.\n'
                         sys.exit(1)
-                    # If indel, mark a window of WINDOW bp at both flanks of the indel position/footprint
-                    if len(ref) != len(alt):
-                        # If deletion: footprint is the length of the REF, only downstream
-                        if len(ref) > len(alt):
-                            ftprint = len(ref) - 1
-                        else:
-                            ftprint = 0
-                        for position in range(int(pos) - WINDOW, int(pos) + ftprint + WINDOW + 1):
-                            indelPos.add(chrom + ':' + str(position))
-
-        # Second: extract SNVs overlapping indels
-        with open(vcfFile, 'r') as vcf:
-            for line in vcf:
-                if not line.startswith('#'):
-                    col = line.strip().split('\t')
-                    chrom = col[0]
-                    pos = col[1]
-                    ref = col[3]
-                    alt = col[4]
-
-                    # For each SNV: check if it's near an indel
-                    if len(ref) == len(alt):
-                        location = chrom + ':' + pos
-                        if len(ref) != 1:
-                            print '\nERROR: MNP found at ' + location + '. Use splitMAandMNPs.py first.\n'
-                            sys.exit(1) 
-                        # If near an indel: add to flaggedSNVs set
-                        if location in indelPos:
-                            id = chrom + ':' + pos + ',' + ref + '>' + alt
-                            flaggedSNVs.add(id)
+                    snvs.append((chrom, pos, variant_id(rec)))
+
+        # Extract SNVs overlapping indel windows
+        indelWindows.finalise()
+        for chrom, pos, id in snvs:
+            if indelWindows.contains(chrom, int(pos)):
+                flaggedSNVs.add(id)
 
 
 # Write flagged SNVs from all files to output file
@@ -103,5 +87,7 @@ with open(outFile, 'w') as out:
     for snv in sorted(flaggedSNVs):
         out.write(snv + '\n')
 
+record_counts(indel_flagged_snvs=len(flaggedSNVs))
+
 
 print 'Done\n'
@@ -17,12 +17,20 @@
 This script is used to extract indels from multiple Platypus VCFs. In each VCF, it selects 
 only bi-allelic indels without any of the flags badReads, MQ, strandBias, SC, or QD, 
 and merges them into a set of indels, which is output to a new VCF file.
+The VCFs are merged as coordinate-ordered streams, so that only the indels at one position are
+kept in memory, and the output file is sorted by chromosome (in natural order) and position.
+The output file is also written BGZF-compressed (.sorted.vcf.gz) and tabix-indexed, ready for
+genotyping with Platypus.
 """
 
 
 import sys
 import os
 import re
+from somatypuslib.vcf import VcfRecord, merge_sorted, group_by_position
+from somatypuslib.bgzf import IndexedVcfWriter
+from somatypuslib.calls import is_selected_indel, variant_id
+from somatypuslib.telemetry import record_counts
 
 
 # If not 2 arguments: print help
@@ -32,7 +40,8 @@ if len(sys.argv) != 3:
     print '                         For each VCF, it selects only bi-allelic indels without any of the'
     print '                         flags: badReads, MQ, strandBias, SC, or QD.'
     print '                         It ensures that no two indels share position in different samples.'
-    print '                  Input: A text file with paths to VCF files, one per line.'
+    print '                         The output VCF is also written compressed and indexed (.sorted.vcf.gz).'
+    print '                  Input: A text file with paths to VCF files (.vcf or .vcf.gz), one per line.'
     print '                         Path to (existing) output folder.'
     print '                  Usage: Somatypus_IndelMerge.py /path/to/fileList.txt /path/to/outDir\n'
     sys.exit(0)
@@ -41,48 +50,39 @@ if len(sys.argv) != 3:
 script, inputFile, outDir = sys.argv
 
 
-# Extract indels from each sample
-indels = {}
+# Read list of VCF files
 with open(inputFile, 'r') as vcfList:
-    for listLine in vcfList:
-        vcfFile = listLine.strip()
-        print 'Extracting indels from file ' + vcfFile
-        with open(vcfFile, 'r') as vcf:
-            for line in vcf:
-                if not line.startswith('#'):
-                    col = line.strip().split('\t')
-                    chrom = col[0]
-                    pos = col[1]
-                    ref = col[3]
-                    alt = col[4]
-                    filter = col[6]
-                    # Look for bi-allelic indels without flags badReads, MQ, strandBias, SC, or QD
-                    if ',' not in alt and len(ref) != len(alt) \
-                      and 'badReads' not in filter and 'MQ' not in filter and 'strandBias' not in filter and 'SC' not in filter and 'QD' not in filter:
-                        id = chrom + ':' + pos + ',' + ref + '>' + alt
-                        if id not in indels:
-                            indels[id] = line
-
-
-# Discard multi-allelic calls that never occur together but are on the same position
-mergedIndels = {}
-for id in indels:
-    # Extract CHR:POS, and group indels according to it
-    location = id.split(',')[0]
-    if location in mergedIndels:
-        mergedIndels[location].append(indels[id])
-    else:
-        mergedIndels[location] = [indels[id]]
-
-
-# Write merged indels to output file
+    vcfFiles = [listLine.strip() for listLine in vcfList if listLine.strip() != '']
+for vcfFile in vcfFiles:
+    print 'Extracting indels from file ' + vcfFile
+
+
 outFile = outDir + '/MergedIndels.vcf'
 print '\nMerging indels into file ' + outFile
 
-with open(outFile, 'w') as out:
-    for loc in sorted(mergedIndels):
-        # Omit entries (positions) with more than one element (indel)
-        if len(mergedIndels[loc]) == 1:
-            out.write(mergedIndels[loc][0])
+
+# Select bi-allelic indels without flags badReads, MQ, strandBias, SC, or QD
+def select(line):
+    return is_selected_indel(VcfRecord(line))
+
+
+# Merge the selected indels from all samples in coordinate order, one position at a time
+indelCount = 0
+with IndexedVcfWriter(outDir + '/MergedIndels.sorted.vcf.gz', outFile) as out:
+    for group in group_by_position(merge_sorted(vcfFiles, select=select)):
+        indels = {}
+        for rec in group:
+            indel = VcfRecord(rec[5])
+            id = variant_id(indel)
+            if id not in indels:
+                indels[id] = indel.line
+
+        # Discard multi-allelic calls that never occur together but are on the same position
+        # (omit positions with more than one indel)
+        if len(indels) == 1:
+            out.write(indels.values()[0])
+            indelCount = indelCount + 1
+
+record_counts(files=len(vcfFiles), indels=indelCount)
 
 print 'Done\n'
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_JoinGenotypes.py
+# Joins the genotypes of variants in the samples of a previous run and in new samples into a single VCF file
+# Called by join_genotypes()
+
+# INPUT
+# previousList: text file with paths to VCF files genotyped in the samples of the previous run, one per line
+# newList: text file with paths to VCF files genotyped in the new samples, one per line
+# orderFile: path to a VCF file whose sample order is used in the output ('none' to use the input order)
+# outFile: path to output VCF file
+
+
+"""
+This script is used in incremental runs (where new samples are added to a completed run) to
+join, for each variant of the previous run, its genotypes in the samples of the previous run
+(taken from the genotyped VCFs of that run) and its genotypes in the new samples. The
+genotyped VCFs of each set are merged as coordinate-ordered streams, and each variant
+(CHROM, POS, REF, ALT) found in both sets is written once, with the fixed columns (QUAL,
+FILTER and INFO) of the previous run, followed by the sample columns of the previous and
+the new samples. Variants found in only one of the sets (not genotyped by Platypus in the
+new samples, or no longer in the same merged VCF) are discarded. If a VCF is given for the
+sample order (such as a VCF genotyped in all the samples), the sample columns are written in
+its order (it must hold the same samples); the header is that of the first VCF of the
+previous run.
+"""
+
+
+import sys
+import os
+import re
+from somatypuslib.vcf import VcfReader, open_vcf, merge_sorted, group_by_position, sample_names, sample_order
+from somatypuslib.telemetry import record_counts
+
+
+# If not 4 arguments: print help
+if len(sys.argv) != 5:
+    print '\nSomatypus_JoinGenotypes.py: Joins the genotypes of variants in the samples of a previous run and in new samples'
+    print '                            into a single VCF file. Variants not genotyped in both sets of samples are discarded.'
+    print '                     Input: A text file with paths to VCFs genotyped in the samples of the previous run, one per line.'
+    print '                            A text file with paths to VCFs genotyped in the new samples, one per line.'
+    print '                            Path to a VCF file whose sample order is used in the output (\'none\' to write'
+    print '                            the samples of the previous run followed by the new samples).'
+    print '                            Path to output VCF file.'
+    print '                     Usage: Somatypus_JoinGenotypes.py /path/to/previousList.txt /path/to/newList.txt /path/to/order.vcf /path/to/output.vcf\n'
+    sys.exit(0)
+
+
+script, previousList, newList, orderFile, outFile = sys.argv
+
+
+# Read lists of VCF files
+with open(previousList, 'r') as vcfList:
+    previousFiles = [listLine.strip() for listLine in vcfList if listLine.strip() != '']
+with open(newList, 'r') as vcfList:
+    newFiles = [listLine.strip() for listLine in vcfList if listLine.strip() != '']
+for vcfFile in previousFiles:
+    print '\nInput file (previous samples):', vcfFile
+for vcfFile in newFiles:
+    print 'Input file (new samples):     ', vcfFile
+print 'Output file:                  ', outFile
+
+
+# Read the header and sample names of each VCF
+headers = []
+for vcfFile in previousFiles + newFiles:
+    with VcfReader(vcfFile) as vcf:
+        headers.append(vcf.header)
+previousNames = sample_names(headers[0])
+newNames = sample_names(headers[len(previousFiles)])
+outNames = previousNames + newNames
+if orderFile != 'none':
+    with VcfReader(orderFile) as vcf:
+        orderNames = sample_names(vcf.header)
+    if sorted(orderNames) != sorted(outNames):
+        print '\nERROR: ' + orderFile + ' does not hold the same samples as the previous and new VCFs\n'
+        sys.exit(1)
+    outNames = orderNames
+
+
+# Order of the sample columns of each VCF within its set of samples
+orders = []
+try:
+    for i, header in enumerate(headers):
+        orders.append(sample_order(sample_names(header), previousNames if i < len(previousFiles) else newNames))
+except ValueError:
+    print '\nERROR: ' + (previousFiles + newFiles)[i] + ' does not hold the same samples as the other VCFs of its set\n'
+    sys.exit(1)
+
+# Order of the joined sample columns (previous samples followed by new samples) in the output
+outOrder = sample_order(previousNames + newNames, outNames)
+
+
+# Join the lines of a variant in the previous and the new samples
+def join(previousLine, previousIndex, newLine, newIndex):
+    previousCols = previousLine.rstrip('\r\n').split('\t')
+    previousSamples = previousCols[9:]
+    newSamples = newLine.rstrip('\r\n').split('\t')[9:]
+    samples = [previousSamples[i] for i in orders[previousIndex]] + [newSamples[i] for i in orders[newIndex]]
+    return '\t'.join(previousCols[:9] + [samples[i] for i in outOrder]) + '\n'
+
+
+counts = {'joined': 0, 'previous': 0, 'new': 0}
+with open_vcf(outFile, 'w') as out:
+    # Header (with the output sample names in the #CHROM line)
+    out.writelines(headers[0][:-1])
+    out.write('\t'.join(headers[0][-1].rstrip('\r\n').split('\t')[:9] + outNames) + '\n')
+
+    # Merge the calls of both sets in coordinate order, keeping the first call of each variant in each set
+    for group in group_by_position(merge_sorted(previousFiles + newFiles)):
+        previousCalls = {}
+        newCalls = {}
+        ids = []
+        for rec in group:
+            id = tuple(rec[5].split('\t', 5)[3:5])
+            calls = previousCalls if rec[2] < len(previousFiles) else newCalls
+            if id not in calls:
+                calls[id] = (rec[5], rec[2])
+                if id not in ids:
+                    ids.append(id)
+        for id in ids:
+            if id in previousCalls and id in newCalls:
+                out.write(join(previousCalls[id][0], previousCalls[id][1], newCalls[id][0], newCalls[id][1]))
+                counts['joined'] = counts['joined'] + 1
+            elif id in previousCalls:
+                counts['previous'] = counts['previous'] + 1
+            else:
+                counts['new'] = counts['new'] + 1
+
+
+print '\n' + str(counts['joined']) + ' variants joined'
+print str(counts['previous']) + ' variants not genotyped in the new samples discarded'
+print str(counts['new']) + ' variants not genotyped in the previous samples discarded'
+record_counts(variants_joined=counts['joined'], previous_only_discarded=counts['previous'],
+              new_only_discarded=counts['new'])
+print 'Done\n'
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_Manifest.py
+# Records the parameters and files of completed pipeline steps, and checks whether they are up to date
+# Called by checkpoint(), call_sample() and validate_checkpoint()
+
+# INPUT
+# mode: 'record' or 'check'
+# manifestFile: path to manifest file
+# key: (record mode) identifier of the unit of work (step number, or step:sample)
+# params: (record mode) parameters string of the unit of work
+# files: (record mode) paths to its output files, and to its external input files with prefix 'ext:'
+# (check mode) standard input: lines of key<TAB>params to check
+
+
+"""
+This script is used to maintain the manifest of completed units of work of a pipeline run
+(see somatypuslib/manifest.py). In record mode, it appends a unit of work with its
+parameters, the MD5 hashes of its output files, and the size and modification time of its
+external input files. In check mode, it reads units of work (key and current parameters)
+from the standard input, and prints the keys of those that are not up to date: not
+recorded, recorded with different parameters, or with any file missing or changed.
+"""
+
+
+import sys
+import os
+import re
+from somatypuslib.manifest import Manifest
+
+
+# If not enough arguments: print help
+if len(sys.argv) < 3 or sys.argv[1] not in ('record', 'check') or (sys.argv[1] == 'record' and len(sys.argv) < 5):
+    print '\nSomatypus_Manifest.py: Records the parameters and files of completed pipeline steps, and checks whether they are up to date.'
+    print '                Input: Mode (record or check).'
+    print '                       Path to manifest file.'
+    print '                       Record mode: key, parameters string, and paths to output files'
+    print '                                    (and to external input files, with prefix ext:).'
+    print '                       Check mode: lines of key<TAB>parameters in the standard input.'
+    print '                Usage: Somatypus_Manifest.py record /path/to/MANIFEST key "params" /path/to/output.vcf ext:/path/to/input.bam'
+    print '                       Somatypus_Manifest.py check /path/to/MANIFEST < keys.txt\n'
+    sys.exit(0)
+
+
+mode = sys.argv[1]
+manifest = Manifest(sys.argv[2])
+
+
+if mode == 'record':
+    key, params = sys.argv[3:5]
+    outputs = [path for path in sys.argv[5:] if not path.startswith('ext:')]
+    externals = [path[4:] for path in sys.argv[5:] if path.startswith('ext:')]
+    manifest.record(key, params, outputs, externals)
+
+# Print the keys of the units of work which are not up to date
+else:
+    for line in sys.stdin:
+        if line.strip() == '':
+            continue
+        key, params = line.rstrip('\n').split('\t', 1)
+        if not manifest.is_current(key, params):
+            print key
@@ -6,16 +6,21 @@
 # Updated by Kevin Gori, 26/01/2017
 
 # Somatypus_MergeRegions.py
-# Merges 'var-regions' used for re-genotyping of indels that are missing after genotyping
-# Called by genotyping()
+# Merges overlapping regions in a regions file
+# Called by the user (the pipeline merges regions with Somatypus_VariantWindows.py and Somatypus_MissingCalls.py)
 
 # INPUT
-# regionsFile: file with the regions in CHR:START-END format, one per line
+# regionsFile: file with the regions in CHR:START-END format, one per line (or a BED file, ending in .bed)
+# outFile: path to output regions file (optional; in BED format if it ends in .bed)
 
 
 """
-This script is used to merge the regions used for re-genotyping of indels that are
-missing after the first genotyping.
+This script is used to merge overlapping regions, such as the regions used for
+re-genotyping of indels that are missing after the first genotyping. The regions of each
+chromosome are sorted and merged while they overlap, and written in chromosome (string)
+order. Regions can be read and written in CHR:START-END format or BED format (by the file
+extension); by default, the output file is the input path ending in '_merged', in the
+same format as the input. Only a summary is written to the log.
 """
 
 
@@ -23,74 +28,47 @@ import sys
 import os
 import re
 from collections import defaultdict
+from somatypuslib.regions import is_bed, read_regions, format_region, merge_regions
 
 
-# If not 1 arguments: print help
-if len(sys.argv) != 2:
-    print ('\nSomatypus_MergeRegions.py: Merges the regions used for re-genotyping of indels that are')
-    print ('                           missing after the first genotyping.')
-    print ('                           Input: A file with the regions in CHR:START-END format, one per line.')
-    print ('                           Usage: Somatypus_MergeRegions.py /path/to/regions.txt\n')
+# If not 1 or 2 arguments: print help
+if len(sys.argv) not in (2, 3):
+    print ('\nSomatypus_MergeRegions.py: Merges overlapping regions in a regions file.')
+    print ('                           Input: A file with the regions in CHR:START-END format, one per line,')
+    print ('                                  or a BED file (.bed).')
+    print ('                                  Path to output file (optional; BED format if it ends in .bed).')
+    print ('                           Usage: Somatypus_MergeRegions.py /path/to/regions.txt [/path/to/output.bed]\n')
     sys.exit(0)
 
 
-script, regionsFile = sys.argv
+regionsFile = sys.argv[1]
 
 
 # Compose paths to output region file
 print ('\nInput file: ', regionsFile)
-outFile = regionsFile[:-4] + '_merged.txt'
+if len(sys.argv) == 3:
+    outFile = sys.argv[2]
+else:
+    outFile = regionsFile[:-4] + '_merged' + regionsFile[-4:]
 print ('Output file:', outFile)
 
 
-# Variable for storing original regions
-regions = defaultdict(list)
-
-
 # Read original regions
-print ('\nReading regions...\n')
-with open(regionsFile, 'r') as input_:
-    for line in input_:
-        if line == '\n': continue
-        chrom, start_end = line.strip().split(':')
-        start, end = start_end.split('-')
-        regions[chrom].append([int(start), int(end)])
-
-chroms = sorted(regions)
+print ('\nReading regions...')
+regions = defaultdict(list)
+inCount = 0
+for line, chrom, start, end in read_regions(regionsFile, is_bed(regionsFile)):
+    regions[chrom].append([start, end])
+    inCount = inCount + 1
 
 
-# For each unprocessed region: merge it with the regions overlapping it
+# Merge the regions of each chromosome while they overlap
+outCount = 0
+bed = is_bed(outFile)
 with open(outFile, 'w') as out:
-    for chrom in chroms:
-        # sort regions list by ascending starts, so never have to deal with overlaps below the current region
-        regions[chrom].sort()
-
-        # don't do work on empty list
-        if len(regions[chrom]) == 0:
-            continue
-
-        merged_region = regions[chrom][0]
-        positions = merged_region[:] # this is only used so terminal output is the same as original version
-
-        for test_region in regions[chrom][1:]:
-            # If test_region starts before the active merged_region ends, then we know they overlap
-            if test_region[0] <= merged_region[1]:
-                # Removed an assertion here that wasn't true - KG Jan 2020
-
-                # update the end of the merged region if test region end is beyond it, and the positions
-                merged_region[1] = max(merged_region[1], test_region[1])
-                positions.extend(test_region)
-            else:
-                # new region doesn't overlap, so let's pack up and move on
-                out.write('{}:{}-{}\n'.format(chrom, merged_region[0], merged_region[1]))
-                print('Positions {0} : {1} merged into {0}:{2}-{3}'.format(chrom, positions, merged_region[0],
-                                                                           merged_region[1]))
-                merged_region = test_region
-                positions = merged_region[:]
-
-        # Don't forget to output the final merged region
-        out.write('{}:{}-{}\n'.format(chrom, merged_region[0], merged_region[1]))
-        print('Positions {0} : {1} merged into {0}:{2}-{3}'.format(chrom, positions, merged_region[0],
-                                                                   merged_region[1]))
+    for chrom, start, end in merge_regions(regions):
+        out.write(format_region(chrom, start, end, bed))
+        outCount = outCount + 1
 
+print ('{} regions in {} chromosomes merged into {} regions'.format(inCount, len(regions), outCount))
 print ('\nDone\n')
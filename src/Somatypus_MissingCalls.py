@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_MissingCalls.py
+# Writes the regions of the merged variants that are missing after the first genotyping
+# Called by genotyping() and genotyping_indelflagged()
+
+# INPUT
+# mergedFile: path to merged VCF file (variants to genotype)
+# genotypedFile: path to VCF file genotyped from the merged VCF
+# outFile: path to output regions file
+# mergeRegions: 'yes' to merge overlapping regions, or 'no'
+
+
+"""
+This script is used to find the variants of a merged VCF which have not been genotyped by
+Platypus (due to the way it builds haplotypes), so that they can be re-genotyped. The
+genotyped variants (CHROM, POS, REF, ALT) are stored in a hash set, and the merged VCF is
+read line by line, writing a region in CHR:START-END format for each variant not in the
+set. Each region spans the longer of the reference and alternative alleles. If the regions
+are merged, the regions of each chromosome are sorted and merged while they overlap (as
+done by Somatypus_MergeRegions.py); otherwise they are written in the order of the merged
+VCF. No intermediate files are written.
+"""
+
+
+import sys
+import os
+from somatypuslib.vcf import open_vcf
+from somatypuslib.regions import merge_regions
+from somatypuslib.telemetry import record_counts
+
+
+# If not 4 arguments: print help
+if len(sys.argv) != 5 or sys.argv[4] not in ('yes', 'no'):
+    print '\nSomatypus_MissingCalls.py: Writes the regions of the variants in a merged VCF file which are missing'
+    print '                           in the VCF file genotyped from it.'
+    print '                    Input: Path to merged VCF file (.vcf or .vcf.gz).'
+    print '                           Path to genotyped VCF file (.vcf or .vcf.gz).'
+    print '                           Path to output regions file.'
+    print '                           Whether to merge overlapping regions (yes or no).'
+    print '                    Usage: Somatypus_MissingCalls.py /path/to/merged.vcf /path/to/genotyped.vcf /path/to/regions.txt yes\n'
+    sys.exit(0)
+
+
+script, mergedFile, genotypedFile, outFile, mergeRegions = sys.argv
+print '\nInput files: ', mergedFile
+print '             ', genotypedFile
+print 'Output file: ', outFile
+
+
+# Returns the CHROM, POS, REF and ALT columns of a VCF line
+def variant_key(line):
+    cols = line.split('\t', 5)
+    return '\t'.join((cols[0], cols[1], cols[3], cols[4].rstrip('\r\n')))
+
+
+# Store the genotyped variants (if there is no genotyped VCF, no variant has been genotyped)
+genotyped = set()
+if os.path.exists(genotypedFile):
+    with open_vcf(genotypedFile) as vcf:
+        for line in vcf:
+            if not line.startswith('#'):
+                genotyped.add(variant_key(line))
+else:
+    print '\nWARNING: Genotyped VCF not found; all the merged variants are considered missing'
+print '\n' + str(len(genotyped)) + ' genotyped variants'
+
+
+# Find the merged variants missing from the genotyped VCF, and write their regions
+mergedCount = 0
+missingCount = 0
+regionCount = 0
+regions = {}
+with open_vcf(mergedFile) as vcf, open(outFile, 'w') as out:
+    for line in vcf:
+        if line.startswith('#'):
+            continue
+        mergedCount = mergedCount + 1
+        key = variant_key(line)
+        if key in genotyped:
+            continue
+        missingCount = missingCount + 1
+        chrom, pos, ref, alt = key.split('\t')
+        start = int(pos)
+        end = start + max(len(ref), len(alt)) - 1
+        if mergeRegions == 'yes':
+            if chrom in regions:
+                regions[chrom].append([start, end])
+            else:
+                regions[chrom] = [[start, end]]
+        else:
+            out.write(chrom + ':' + str(start) + '-' + str(end) + '\n')
+            regionCount = regionCount + 1
+
+    if mergeRegions == 'yes':
+        for chrom, start, end in merge_regions(regions):
+            out.write(chrom + ':' + str(start) + '-' + str(end) + '\n')
+            regionCount = regionCount + 1
+
+
+print str(mergedCount) + ' merged variants'
+print str(missingCount) + ' missing variants'
+print str(regionCount) + ' regions written'
+record_counts(merged_variants=mergedCount, genotyped_variants=len(genotyped),
+              missing_variants=missingCount, regions_written=regionCount)
+print 'Done\n'
@@ -18,13 +18,20 @@
 This script is used to merge SNVs from multiple Platypus VCFs. In each VCF, it selects only SNVs 
 that are not included in the list of SNVs to exclude (SNVs near indels, in principle). 
 For multiallelic SNVs, it outputs extra alleles to different files for independent genotyping.
+The VCFs are merged as coordinate-ordered streams, so that only the SNVs at one position are
+kept in memory, and the output files are sorted by chromosome (in natural order) and position.
+Each output file is also written BGZF-compressed (.sorted.vcf.gz) and tabix-indexed, ready
+for genotyping with Platypus.
 """
 
 
 import sys
 import os
 import re
-from sets import Set
+from somatypuslib.vcf import VcfRecord, merge_sorted, group_by_position
+from somatypuslib.bgzf import IndexedVcfWriter
+from somatypuslib.calls import variant_id, write_alleles
+from somatypuslib.telemetry import record_counts
 
 
 # If not 3 arguments: print help
@@ -35,8 +42,9 @@ if len(sys.argv) != 4:
     print '                       For each VCF, it selects only SNVs that are not included in the list of SNVs'
     print '                       to exclude (SNVs located at <5 bp from an indel, in principle).'
     print '                       For multiallelic SNVs, it outputs extra alleles to different files for'
-    print '                       independent genotyping.\n'
-    print '                Input: A text file with paths to VCF files, one per line.'
+    print '                       independent genotyping.'
+    print '                       Output VCFs are also written compressed and indexed (.sorted.vcf.gz).\n'
+    print '                Input: A text file with paths to VCF files (.vcf or .vcf.gz), one per line.'
     print '                       A text file with a list of SNVs to exclude, in CHROM:POS,REF>ALT format.'
     print '                       Path to (existing) output folder.'
     print '                Usage: Somatypus_SNVmerge.py /path/to/fileList.txt /path/to/excludeList.txt /path/to/outDir\n'
@@ -48,42 +56,15 @@ script, inputFile, excludeFile, outDir = sys.argv
 
 # Read list of SNVs to exclude (<5bp from an indel in any sample)
 print '\nReading list of SNVs to exclude from file ' + excludeFile
-flaggedSNVs = Set([])
 with open(excludeFile, 'r') as excludeList:
-    flaggedSNVs = Set(line.strip() for line in excludeList)
-    
+    flaggedSNVs = set(line.strip() for line in excludeList)
 
-# Extract SNVs from each sample, if they are not in the exclude list
-mergedSNVs = {}
-excludedSNVs = {}
+
+# Read list of VCF files
 with open(inputFile, 'r') as vcfList:
-    for listLine in vcfList:
-        vcfFile = listLine.strip()
-        print 'Extracting SNVs from file ' + vcfFile
-        with open(vcfFile, 'r') as vcf:
-            for line in vcf:
-                if not line.startswith('#'):
-                    col = line.strip().split('\t')
-                    chrom = col[0]
-                    pos = col[1]
-                    ref = col[3]
-                    alt = col[4]
-                    # Check for MA variants
-                    if ',' in alt:
-                        print '\nERROR: Multiallelic variant found at ' + chrom + ':' + pos + '. Use splitMAandMNPs.py first.\n'
-                        sys.exit(1)
-
-                    # For each SNV: if in flagged list, write to excluded SNVs set; else, write to merged SNVs set
-                    if len(ref) == len(alt):
-                        # Check for MNPs
-                        if len(ref) != 1:
-                            print '\nERROR: MNP found at ' + chrom + ':' + pos + '. Use splitMAandMNPs.py first.\n'
-                            sys.exit(1)
-                        id = chrom + ':' + pos + ',' + ref + '>' + alt
-                        if id in flaggedSNVs and id not in excludedSNVs:
-                            excludedSNVs[id] = line
-                        if id not in flaggedSNVs and id not in mergedSNVs:
-                            mergedSNVs[id] = line
+    vcfFiles = [listLine.strip() for listLine in vcfList if listLine.strip() != '']
+for vcfFile in vcfFiles:
+    print 'Extracting SNVs from file ' + vcfFile
 
 
 # Compose paths of output VCF files
@@ -101,39 +82,48 @@ print '                                       ' + outFileF2
 print '                                       ' + outFileF3
 
 
-# Write merged, de-duplicated SNVs to output file corresponding to its allele number
-with open(outFile1, 'w') as out1, open(outFile2, 'w') as out2, open(outFile3, 'w') as out3:
-    lastPos = ''
-    second = False
-    for id in sorted(mergedSNVs):
-        pos = id.split(',')[0]
-        if lastPos != pos:
-            out1.write(mergedSNVs[id])
-            lastPos = pos
-            second = False
-        elif not second:
-            out2.write(mergedSNVs[id])
-            second = True
-        else:
-            out3.write(mergedSNVs[id])
-            second = False
-
-
-# Write merged indel-excluded SNVs to output file corresponding to its allele number
-with open(outFileF1, 'w') as out1, open(outFileF2, 'w') as out2, open(outFileF3, 'w') as out3:
-    lastPos = ''
-    second = False
-    for id in sorted(excludedSNVs):
-        pos = id.split(',')[0]
-        if lastPos != pos:
-            out1.write(excludedSNVs[id])
-            lastPos = pos
-            second = False
-        elif not second:
-            out2.write(excludedSNVs[id])
-            second = True
-        else:
-            out3.write(excludedSNVs[id])
-            second = False
+# Open an output VCF, together with its compressed and indexed copy (.sorted.vcf.gz)
+def open_output(outFile):
+    return IndexedVcfWriter(outFile[:-4] + '.sorted.vcf.gz', outFile)
+
+
+# Merge the SNVs from all samples in coordinate order, one position at a time
+# For each SNV: if in flagged list, write to excluded SNVs files; else, write to merged SNVs files
+mergedCount = 0
+excludedCount = 0
+with open_output(outFile1) as out1, open_output(outFile2) as out2, open_output(outFile3) as out3, \
+     open_output(outFileF1) as outF1, open_output(outFileF2) as outF2, open_output(outFileF3) as outF3:
+    for group in group_by_position(merge_sorted(vcfFiles)):
+        mergedSNVs = {}
+        excludedSNVs = {}
+        for rec in group:
+            snv = VcfRecord(rec[5])
+            chrom = snv.chrom
+            pos = snv.pos
+            ref = snv.ref
+            alt = snv.alt
+            # Check for MA variants
+            if ',' in alt:
+                print '\nERROR: Multiallelic variant found at ' + chrom + ':' + pos + '. Use splitMAandMNPs.py first.\n'
+                sys.exit(1)
+
+            if len(ref) == len(alt):
+                # Check for MNPs
+                if len(ref) != 1:
+                    print '\nERROR: MNP found at ' + chrom + ':' + pos + '. Use splitMAandMNPs.py first.\n'
+                    sys.exit(1)
+                id = variant_id(snv)
+                if id in flaggedSNVs:
+                    if id not in excludedSNVs:
+                        excludedSNVs[id] = snv.line
+                elif id not in mergedSNVs:
+                    mergedSNVs[id] = snv.line
+
+        write_alleles(mergedSNVs, out1, out2, out3)
+        write_alleles(excludedSNVs, outF1, outF2, outF3)
+        mergedCount = mergedCount + len(mergedSNVs)
+        excludedCount = excludedCount + len(excludedSNVs)
+
+record_counts(files=len(vcfFiles), merged_snvs=mergedCount, indel_excluded_snvs=excludedCount)
 
 print '\nDone\n'
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_SecondPass.py
+# Groups the calls missing after the first genotyping runs into batches, and splits the genotyped batches
+# Called by genotyping_missing()
+
+# INPUT
+# mode: 'split' or 'join'
+# sourcesFile: text file with one line per allele (or indels), with the paths to its regions file of
+#              missing calls, its merged VCF and its second-pass output VCF, separated by tabs
+# batchDir: path to folder for the batch files
+
+
+"""
+This script is used to re-genotype the calls missing after the first genotyping runs of all
+the SNV alleles and indels (see Somatypus_MissingCalls.py) in as few Platypus runs as
+possible. Variants of different alleles (or indels) must be genotyped separately when they
+are close to each other, so each region of missing calls is assigned to the first batch
+where no region of another allele lies within MINDISTANCE bases of it (regions of the same
+allele were already genotyped together). In split mode, the regions of each batch are
+written to varRegions_batchN.txt, and the merged variants overlapping them (the variants
+that Platypus would take from the source VCF of their allele) to batchN.sorted.vcf.gz, which
+is compressed and indexed. In join mode, the Platypus output of each batch
+(GenotypedMissing_batchN.vcf) is split back into the second-pass output VCF of each allele,
+taking each call to the allele of the merged variant it matches or, otherwise, of the
+nearest region in its batch. Output calls are sorted by chromosome and position.
+"""
+
+
+import sys
+import os
+import re
+from bisect import bisect_left, bisect_right
+from somatypuslib.vcf import open_vcf, chrom_key
+from somatypuslib.regions import read_regions
+from somatypuslib.bgzf import IndexedVcfWriter
+from somatypuslib.telemetry import record_counts
+
+
+# Minimum distance (bp) between regions of different alleles genotyped in the same run
+MINDISTANCE = 200
+
+
+# If not 3 arguments: print help
+if len(sys.argv) != 4 or sys.argv[1] not in ('split', 'join'):
+    print '\nSomatypus_SecondPass.py: Groups the calls missing after the first genotyping runs of several alleles into batches'
+    print '                         that can be genotyped in a single Platypus run each (split mode), and splits the'
+    print '                         genotyped batches into the second-pass output VCF of each allele (join mode).'
+    print '                  Input: Mode (split or join).'
+    print '                         A text file with one line per allele (or indels), with the paths to its regions file'
+    print '                         of missing calls, its merged VCF and its output VCF, separated by tabs.'
+    print '                         Path to folder for the batch files.'
+    print '                  Usage: Somatypus_SecondPass.py split /path/to/sources.txt /path/to/batches'
+    print '                         Somatypus_SecondPass.py join /path/to/sources.txt /path/to/batches\n'
+    sys.exit(0)
+
+
+script, mode, sourcesFile, batchDir = sys.argv
+
+
+# Read the alleles with missing calls (regions file, merged VCF, output VCF)
+sources = []
+with open(sourcesFile, 'r') as f:
+    for line in f:
+        if line.strip() == '':
+            continue
+        regionsFile, mergedFile, outFile = line.rstrip('\r\n').split('\t')
+        if os.path.isfile(regionsFile) and os.path.getsize(regionsFile) > 0:
+            sources.append((regionsFile, mergedFile, outFile))
+print '\nSources file:', sourcesFile
+print 'Batch folder:', batchDir
+for regionsFile, mergedFile, outFile in sources:
+    print '\nRegions file:', regionsFile
+    print 'Merged VCF:  ', mergedFile
+    print 'Output file: ', outFile
+
+
+# Read the regions of all the alleles, as (chrom, start, end, source) sorted by position,
+# and assign each one to the first batch with no region of another allele close to it
+# (for each batch, the last chromosome and largest region end of each allele are kept)
+units = []
+for i, (regionsFile, mergedFile, outFile) in enumerate(sources):
+    for line, chrom, start, end in read_regions(regionsFile):
+        units.append((chrom, start, end, i))
+units.sort(key=lambda unit: (chrom_key(unit[0]), unit[1], unit[2], unit[3]))
+
+batches = []
+lastEnds = []
+for chrom, start, end, src in units:
+    for b, last in enumerate(lastEnds):
+        if all(s == src or c != chrom or e + MINDISTANCE < start for s, (c, e) in last.items()):
+            break
+    else:
+        b = len(batches)
+        batches.append([])
+        lastEnds.append({})
+    batches[b].append((chrom, start, end, src))
+    if src in lastEnds[b] and lastEnds[b][src][0] == chrom:
+        end = max(end, lastEnds[b][src][1])
+    lastEnds[b][src] = (chrom, end)
+print '\n' + str(len(units)) + ' regions of missing calls in ' + str(len(batches)) + ' batches'
+
+
+# Regions of each allele and chromosome, as sorted lists of starts, ends and batches
+regions = {}
+for b, batch in enumerate(batches):
+    for chrom, start, end, src in batch:
+        regions.setdefault((src, chrom), []).append((start, end, b))
+for key in regions:
+    intervals = sorted(regions[key])
+    maxLength = max(end - start for start, end, b in intervals)
+    regions[key] = ([i[0] for i in intervals], [i[1] for i in intervals], [i[2] for i in intervals], maxLength)
+
+
+# Returns the batches of the regions of an allele overlapping the interval [start, end]
+def overlapping_batches(src, chrom, start, end):
+    if (src, chrom) not in regions:
+        return []
+    starts, ends, batchIds, maxLength = regions[(src, chrom)]
+    found = []
+    i = bisect_right(starts, end) - 1
+    while i >= 0 and starts[i] >= start - maxLength:
+        if ends[i] >= start and batchIds[i] not in found:
+            found.append(batchIds[i])
+        i = i - 1
+    return found
+
+
+# Returns the CHROM, POS, REF and ALT columns of a VCF line
+def variant_key(line):
+    cols = line.split('\t', 5)
+    return '\t'.join((cols[0], cols[1], cols[3], cols[4].rstrip('\r\n')))
+
+
+# Returns the merged variants of each batch, as lists of (chrom, pos, line, source), and the
+# source of each variant key in each batch
+def batch_variants():
+    variants = [[] for batch in batches]
+    keys = [{} for batch in batches]
+    for src, (regionsFile, mergedFile, outFile) in enumerate(sources):
+        with open_vcf(mergedFile) as vcf:
+            for line in vcf:
+                if line.startswith('#'):
+                    continue
+                cols = line.split('\t', 5)
+                pos = int(cols[1])
+                for b in overlapping_batches(src, cols[0], pos, pos + len(cols[3]) - 1):
+                    variants[b].append((cols[0], pos, line, src))
+                    keys[b][variant_key(line)] = src
+    return variants, keys
+
+
+if mode == 'split':
+
+    # Write the regions and merged variants of each batch
+    variants, keys = batch_variants()
+    variantCount = 0
+    for b, batch in enumerate(batches):
+        with open(os.path.join(batchDir, 'varRegions_batch' + str(b + 1) + '.txt'), 'w') as out:
+            for chrom, start, end, src in batch:
+                out.write(chrom + ':' + str(start) + '-' + str(end) + '\n')
+        variants[b].sort(key=lambda v: (chrom_key(v[0]), v[1]))
+        with IndexedVcfWriter(os.path.join(batchDir, 'batch' + str(b + 1) + '.sorted.vcf.gz')) as out:
+            for chrom, pos, line, src in variants[b]:
+                out.write(line)
+        print 'Batch ' + str(b + 1) + ': ' + str(len(batch)) + ' regions, ' + str(len(variants[b])) + ' variants'
+        variantCount = variantCount + len(variants[b])
+    record_counts(regions=len(units), batches=len(batches), variants_batched=variantCount)
+
+else:
+
+    # Nearest region in a batch to a position, as (distance, source)
+    nearest = [{} for batch in batches]
+    for b, batch in enumerate(batches):
+        for chrom, start, end, src in batch:
+            nearest[b].setdefault(chrom, []).append((start, end, src))
+
+    def nearest_source(b, chrom, pos):
+        intervals = nearest[b].get(chrom)
+        if not intervals:
+            return None
+        i = bisect_left(intervals, (pos + 1,))
+        candidates = []
+        for start, end, src in intervals[max(0, i - 2):i + 1]:
+            candidates.append((max(0, start - pos, pos - end), src))
+        return min(candidates)[1]
+
+    # Take each genotyped call to its allele
+    variants, keys = batch_variants()
+    header = None
+    calls = [[] for source in sources]
+    seen = [set() for source in sources]
+    unmatched = 0
+    for b in range(len(batches)):
+        batchFile = os.path.join(batchDir, 'GenotypedMissing_batch' + str(b + 1) + '.vcf')
+        if not os.path.isfile(batchFile):
+            print '\nERROR: Genotyped batch ' + batchFile + ' not found\n'
+            sys.exit(1)
+        batchHeader = []
+        with open_vcf(batchFile) as vcf:
+            for line in vcf:
+                if line.startswith('#'):
+                    batchHeader.append(line)
+                    continue
+                key = variant_key(line)
+                src = keys[b].get(key)
+                if src is None:
+                    cols = line.split('\t', 2)
+                    src = nearest_source(b, cols[0], int(cols[1]))
+                    unmatched = unmatched + 1
+                if src is not None and key not in seen[src]:
+                    calls[src].append(line)
+                    seen[src].add(key)
+        if header is None:
+            header = batchHeader
+
+    # Write the calls of each allele, sorted by position
+    callCount = 0
+    for src, (regionsFile, mergedFile, outFile) in enumerate(sources):
+        lines = calls[src]
+        lines.sort(key=lambda line: (chrom_key(line.split('\t', 1)[0]), int(line.split('\t', 2)[1])))
+        with open_vcf(outFile, 'w') as out:
+            out.writelines(header or [])
+            out.writelines(lines)
+        print str(len(lines)) + ' calls written to ' + outFile
+        callCount = callCount + len(lines)
+    print str(unmatched) + ' calls not matching a merged variant (taken to the nearest region)'
+    record_counts(batches=len(batches), calls_written=callCount, calls_unmatched=unmatched)
+
+
+print 'Done\n'
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_ShardRegions.py
+# Splits the genotyping regions into shards with similar numbers of variants
+# Called by platypus_genotype()
+
+# INPUT
+# faiFile: path to FASTA index (FAI) of the reference genome
+# regionsFile: file with regions in CHR:START-END format, one per line (or "none")
+# vcfFile: path to VCF with the variants to genotype
+# numShards: number of shards to create
+# outPrefix: prefix of the output shard files
+
+
+"""
+This script is used to split the regions used for genotyping a VCF into a number of shards
+which contain similar numbers of variants, so that they can be genotyped in parallel.
+If a regions file is given, whole regions are assigned to shards; otherwise, the chromosomes
+in the FASTA index are cut at gaps of at least MINGAP bp between variants. Chromosomes are
+kept in the order of the FASTA index (the order used by Platypus), and shards are output in
+coordinate order, so that the genotyped shards can simply be concatenated. Chromosomes
+containing no variants are omitted when no regions file is given.
+"""
+
+
+import sys
+import os
+import re
+from somatypuslib.regions import read_regions, read_vcf_positions
+from somatypuslib.telemetry import record_counts
+
+
+# If not 5 arguments: print help
+if len(sys.argv) != 6:
+    print '\nSomatypus_ShardRegions.py: Splits the genotyping regions into shards with similar numbers of variants.'
+    print '                           If the regions file is "none", whole chromosomes from the FASTA index are split.'
+    print '                           Shards are written to files named <outPrefix>_shard<N>.txt, in CHR:START-END format.'
+    print '                    Input: Path to the FASTA index (FAI) of the reference genome.'
+    print '                           A file with regions in CHR:START-END format, one per line (or "none").'
+    print '                           Path to VCF with the variants to genotype.'
+    print '                           Number of shards.'
+    print '                           Prefix of the output shard files.'
+    print '                    Usage: Somatypus_ShardRegions.py /path/to/genome.fa.fai </path/to/regions.txt|"none"> /path/to/variants.vcf <N> /path/to/outPrefix\n'
+    sys.exit(0)
+
+
+# Minimum distance between consecutive variants for splitting a chromosome between them
+MINGAP = 1000
+
+
+script, faiFile, regionsFile, vcfFile, numShards, outPrefix = sys.argv
+numShards = int(numShards)
+
+
+# Read chromosome order and lengths
+chroms = []
+lengths = {}
+with open(faiFile, 'r') as fai:
+    for line in fai:
+        col = line.split('\t')
+        chroms.append(col[0])
+        lengths[col[0]] = int(col[1])
+order = dict((chrom, i) for i, chrom in enumerate(chroms))
+
+
+# Read variant positions
+print '\nReading file:', vcfFile
+variants = read_vcf_positions(vcfFile)
+numVariants = variants.count()
+print numVariants, 'variants found'
+
+
+# Create the units to distribute among shards, as (chrom, start, end, variant count)
+# (no shards are created if there are no variants)
+units = []
+if numVariants == 0:
+    pass
+elif regionsFile != 'none':
+    print 'Reading regions from file:', regionsFile
+    for line, chrom, start, end in read_regions(regionsFile):
+        units.append((chrom, start, end, len(variants.within(chrom, start, end))))
+    units.sort(key=lambda u: (order.get(u[0], len(order)), u[1], u[2]))
+else:
+    # Cut chromosomes at the middle of the first gap of at least MINGAP bp between variants
+    # after the cumulative variant count (over all chromosomes) reaches a shard boundary
+    print 'Splitting chromosomes from file:', faiFile
+    cumulative = 0
+    cuts = 1
+    for chrom in chroms:
+        positions = variants.within(chrom, 1, lengths[chrom])
+        start = 1
+        count = 0
+        for i, pos in enumerate(positions):
+            count = count + 1
+            cumulative = cumulative + 1
+            if cumulative * numShards >= numVariants * cuts and i + 1 < len(positions) \
+              and positions[i + 1] - pos >= MINGAP:
+                cut = (pos + positions[i + 1]) // 2
+                units.append((chrom, start, cut, count))
+                start = cut + 1
+                count = 0
+                cuts = cuts + 1
+        if count > 0:
+            units.append((chrom, start, lengths[chrom], count))
+
+
+# Distribute consecutive units among shards, closing a shard when the cumulative
+# variant count reaches its share of the total
+shards = []
+current = []
+cumulative = 0
+for chrom, start, end, count in units:
+    current.append('%s:%d-%d\n' % (chrom, start, end))
+    cumulative = cumulative + count
+    if cumulative * numShards >= numVariants * (len(shards) + 1) and len(shards) + 1 < numShards:
+        shards.append(current)
+        current = []
+if current:
+    shards.append(current)
+
+
+# Write shard files
+for i, shard in enumerate(shards):
+    outFile = '%s_shard%d.txt' % (outPrefix, i + 1)
+    with open(outFile, 'w') as out:
+        out.writelines(shard)
+    print len(shard), 'regions written to', outFile
+
+print '\n', len(shards), 'shards created'
+record_counts(variants=numVariants, shards=len(shards))
+print 'Done\n'
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_SparseRegions.py
+# Writes regions around the variants of a sparse VCF, if genotyping them is cheaper than genome-wide
+# Called by prepare_genotyping() and prepare_genotyping_indelflagged()
+
+# INPUT
+# faiFile: path to FASTA index (FAI) of the reference genome
+# windowSize: size (bp) of the region at each side of a variant
+# vcfFile: path to VCF with the variants to genotype
+# outFile: path to output regions file
+
+
+"""
+This script is used to restrict the genotyping of a VCF with few variants (such as the 2nd
+and 3rd alleles of multi-allelic SNVs) to the regions around its variants, when no regions
+are given, so that Platypus does not read the whole genome. The chromosomes in the FASTA
+index are split into the windows of +/-windowSize bp around the variants (clipped to the
+chromosome, and merged where they overlap or are adjacent), as done for each region by
+Somatypus_ExtractRegions.py. Reading each region has an overhead, so the cost of genotyping
+the regions is estimated as the bases they cover plus REGIONCOST bases per region. If this
+is larger than MAXFRACTION of the genome length (or there are no variants), no regions are
+written and the VCF is genotyped genome-wide; otherwise, the regions are written in the
+order of the FASTA index, in CHR:START-END format.
+"""
+
+
+import sys
+import os
+import re
+from somatypuslib.regions import read_vcf_positions, format_region
+from somatypuslib.telemetry import record_counts
+
+
+# Estimated cost (in bases read) of the overhead of each region
+REGIONCOST = 1000
+
+# Maximum fraction of the genome length that the cost of the regions can reach
+MAXFRACTION = 0.5
+
+
+# If not 4 arguments: print help
+if len(sys.argv) != 5 or not sys.argv[2].isdigit():
+    print '\nSomatypus_SparseRegions.py: Writes the regions of +/-N bp around the variants in a VCF file, if genotyping'
+    print '                            them is estimated to be cheaper than genotyping the whole genome (otherwise,'
+    print '                            no regions file is written).'
+    print '                     Input: Path to the FASTA index (FAI) of the reference genome.'
+    print '                            Window size, N (bp at each side of a variant).'
+    print '                            Path to VCF with the variants to genotype.'
+    print '                            Path to output regions file.'
+    print '                     Usage: Somatypus_SparseRegions.py /path/to/genome.fa.fai 200 /path/to/variants.vcf /path/to/regions.txt\n'
+    sys.exit(0)
+
+
+script, faiFile, windowSize, vcfFile, outFile = sys.argv
+windowSize = int(windowSize)
+
+
+# Read chromosome order and lengths
+chroms = []
+lengths = {}
+with open(faiFile, 'r') as fai:
+    for line in fai:
+        col = line.split('\t')
+        chroms.append(col[0])
+        lengths[col[0]] = int(col[1])
+genomeLength = sum(lengths.values())
+
+
+# Read variant positions
+print '\nReading file:', vcfFile
+variants = read_vcf_positions(vcfFile)
+numVariants = variants.count()
+print numVariants, 'variants found'
+
+
+# Windows around the variants of each chromosome (chromosomes missing from the FASTA index
+# are kept after the rest, up to the window of their last variant)
+regions = []
+for chrom in chroms + sorted(set(variants.positions) - set(chroms)):
+    length = lengths.get(chrom, variants.positions.get(chrom, [0])[-1] + windowSize)
+    for start, end in variants.windows(chrom, 1, length, windowSize):
+        regions.append((chrom, start, end))
+bases = sum(end - start + 1 for chrom, start, end in regions)
+cost = bases + REGIONCOST * len(regions)
+print len(regions), 'regions of +/-' + str(windowSize), 'bp covering', bases, 'bp (genome length:', str(genomeLength) + ' bp)'
+
+
+# Write the regions only if they are cheaper to genotype than the whole genome
+if os.path.exists(outFile):
+    os.remove(outFile)
+if numVariants > 0 and cost <= MAXFRACTION * genomeLength:
+    with open(outFile, 'w') as out:
+        for chrom, start, end in regions:
+            out.write(format_region(chrom, start, end))
+    print 'Regions written to file', outFile
+elif numVariants > 0:
+    print 'Too many variants for using regions: the VCF will be genotyped genome-wide'
+    regions = []
+else:
+    print 'No variants: no regions file written'
+
+
+record_counts(variants=numVariants, regions_written=len(regions), bases=bases, genome_bases=genomeLength)
+print '\nDone\n'
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_SplitFlagMerge.py
+# Splits, filters, indel-flags and merges the calls of multiple Platypus output VCF files in a single pass
+# Called by stream_merge()
+
+# INPUT
+# inputFile: text file with paths to VCF files, one per line
+# outDir: path to (existing) output folder
+
+
+"""
+This script runs steps 3 to 7 of the pipeline (as done by Somatypus_SplitMA-MNVs.py, the
+flag filter, Somatypus_IndelFlag.py, Somatypus_SNVmerge.py and Somatypus_IndelMerge.py) on
+a single coordinate-ordered stream of the calls in multiple Platypus VCFs, without writing
+any intermediate files. Each call is split into bi-allelic SNVs and indels as it is read;
+the split indels mark windows for flagging the nearby SNVs of the same VCF, and the SNVs at
+each position are merged (into the files of non-excluded and indel-excluded SNVs) once no
+downstream indel can flag them any more. Bi-allelic, unflagged indels from the unsplit
+calls are merged as well. The output files are identical to those of steps 5 to 7.
+"""
+
+
+import sys
+import os
+import re
+from collections import deque
+from somatypuslib.vcf import VcfRecord, merge_sorted, group_by_position
+from somatypuslib.bgzf import IndexedVcfWriter
+from somatypuslib.calls import WINDOW, has_bad_flag, split_call, indel_window, variant_id, is_selected_indel, write_alleles
+from somatypuslib.telemetry import record_counts
+
+
+# If not 2 arguments: print help
+if len(sys.argv) != 3:
+    print '\nSomatypus_SplitFlagMerge.py: Splits, filters, indel-flags and merges the calls of multiple Platypus'
+    print '                             output VCF files in a single pass, without intermediate files.'
+    print '                             *The VCFs need to be as they are output by Platypus (unsplit calls).*'
+    print '                             It writes the same output files as Somatypus_IndelFlag.py,'
+    print '                             Somatypus_SNVmerge.py and Somatypus_IndelMerge.py (steps 5 to 7).'
+    print '                      Input: A text file with paths to VCF files (.vcf or .vcf.gz), one per line.'
+    print '                             Path to (existing) output folder.'
+    print '                      Usage: Somatypus_SplitFlagMerge.py /path/to/fileList.txt /path/to/outDir\n'
+    sys.exit(0)
+
+
+script, inputFile, outDir = sys.argv
+
+
+# Read list of VCF files
+with open(inputFile, 'r') as vcfList:
+    vcfFiles = [listLine.strip() for listLine in vcfList if listLine.strip() != '']
+for vcfFile in vcfFiles:
+    print 'Extracting calls from file ' + vcfFile
+
+
+# Compose paths of output files
+outFile1 = outDir + '/MergedSNVs_allele1.vcf'
+outFile2 = outDir + '/MergedSNVs_allele2.vcf'
+outFile3 = outDir + '/MergedSNVs_allele3.vcf'
+outFileF1 = outDir + '/IndelExcludedSNVs_allele1.vcf'
+outFileF2 = outDir + '/IndelExcludedSNVs_allele2.vcf'
+outFileF3 = outDir + '/IndelExcludedSNVs_allele3.vcf'
+outFileI = outDir + '/MergedIndels.vcf'
+flagFile = outDir + '/indel_flagged_SNVs.txt'
+print '\nMerging non-excluded SNVs into files ' + outFile1
+print '                                     ' + outFile2
+print '                                     ' + outFile3
+print '\nMerging indel-excluded SNVs into files ' + outFileF1
+print '                                       ' + outFileF2
+print '                                       ' + outFileF3
+print '\nMerging indels into file ' + outFileI
+
+
+# Replace each call by its split calls, and by itself if it is a selected (bi-allelic, unflagged) indel
+def expand(line):
+    rec = VcfRecord(line)
+    records = []
+    if is_selected_indel(rec):
+        records.append((int(rec.pos), rec, 'indel'))
+    for newLine in split_call(rec):
+        if newLine is line:
+            records.append((int(rec.pos), rec, 'split'))
+        else:
+            newRec = VcfRecord(newLine)
+            records.append((int(newRec.pos), newRec, 'split'))
+    return records
+
+
+# Open an output VCF, together with its compressed and indexed copy (.sorted.vcf.gz)
+def open_output(outFile):
+    return IndexedVcfWriter(outFile[:-4] + '.sorted.vcf.gz', outFile)
+
+
+flaggedSNVs = set()
+counts = {'positions': 0, 'indels': 0}
+
+
+# Write the de-duplicated SNVs at one position: unflagged calls are written to the excluded
+# SNVs files if they were flagged in any VCF, and to the merged SNVs files otherwise
+def write_position(entry):
+    mergedSNVs = {}
+    excludedSNVs = {}
+    for id, line in entry['calls']:
+        if id in entry['flagged']:
+            if id not in excludedSNVs:
+                excludedSNVs[id] = line
+        elif id not in mergedSNVs:
+            mergedSNVs[id] = line
+    write_alleles(mergedSNVs, out1, out2, out3)
+    write_alleles(excludedSNVs, outF1, outF2, outF3)
+    flaggedSNVs.update(entry['flagged'])
+    counts['positions'] = counts['positions'] + 1
+
+
+# Merge the calls from all samples in coordinate order, one position at a time
+# SNV positions are kept pending until the current position is more than WINDOW bp downstream,
+# as an indel up to WINDOW bp downstream of an SNV can still flag it
+with open_output(outFile1) as out1, open_output(outFile2) as out2, open_output(outFile3) as out3, \
+     open_output(outFileF1) as outF1, open_output(outFileF2) as outF2, open_output(outFileF3) as outF3, \
+     open_output(outFileI) as outI:
+    pending = deque()
+    # End of the rightmost indel window so far in each VCF, as (chromosome, position)
+    reach = {}
+
+    for group in group_by_position(merge_sorted(vcfFiles, expand=expand)):
+        chrom = group[0][4]
+        pos = group[0][1]
+        while pending and (pending[0]['chrom'] != chrom or pending[0]['pos'] < pos - WINDOW):
+            write_position(pending.popleft())
+
+        # Indels: merge the selected indels, and flag SNVs within the windows of the split indels
+        indels = {}
+        for rank, pos, fileIndex, lineNo, chrom, rec, kind in group:
+            if kind == 'indel':
+                id = variant_id(rec)
+                if id not in indels:
+                    indels[id] = rec.line
+            elif len(rec.ref) != len(rec.alt):
+                end = indel_window(rec)[1]
+                # All pending positions are within WINDOW bp upstream of the indel
+                for entry in pending:
+                    if fileIndex in entry['files']:
+                        entry['flagged'].update(entry['files'][fileIndex])
+                if fileIndex not in reach or reach[fileIndex][0] != chrom or reach[fileIndex][1] < end:
+                    reach[fileIndex] = (chrom, end)
+
+        # Discard multi-allelic calls that never occur together but are on the same position
+        # (omit positions with more than one indel)
+        if len(indels) == 1:
+            outI.write(indels.values()[0])
+            counts['indels'] = counts['indels'] + 1
+
+        # SNVs: flag those within the window of an upstream indel in the same VCF, and keep
+        # those without flags badReads, MQ, strandBias, SC or QD for merging
+        entry = {'chrom': chrom, 'pos': pos, 'files': {}, 'flagged': set(), 'calls': []}
+        for rank, pos, fileIndex, lineNo, chrom, rec, kind in group:
+            if kind == 'split' and len(rec.ref) == len(rec.alt):
+                id = variant_id(rec)
+                if fileIndex in reach and reach[fileIndex][0] == chrom and reach[fileIndex][1] >= pos:
+                    entry['flagged'].add(id)
+                entry['files'].setdefault(fileIndex, []).append(id)
+                if not has_bad_flag(rec.filter):
+                    entry['calls'].append((id, rec.line))
+        if entry['files']:
+            pending.append(entry)
+
+    while pending:
+        write_position(pending.popleft())
+
+
+print '\n' + str(counts['positions']) + ' SNV positions and ' + str(counts['indels']) + ' indels merged'
+
+
+# Write flagged SNVs from all files to output file
+print 'Writing ' + str(len(flaggedSNVs)) + ' indel-flagged SNVs to ' + flagFile
+with open(flagFile, 'w') as out:
+    for snv in sorted(flaggedSNVs):
+        out.write(snv + '\n')
+
+record_counts(files=len(vcfFiles), snv_positions=counts['positions'], indels=counts['indels'],
+              indel_flagged_snvs=len(flaggedSNVs))
+
+
+print 'Done\n'
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_SplitNewVariants.py
+# Splits the merged variants of an incremental run into variants new to the run and variants of the previous run
+# Called by prepare_genotyping()
+
+# INPUT
+# previousDir: path to folder with the merged VCF files of the previous run
+# currentDir: path to folder with the merged VCF files of the current run
+# outDir: path to (existing) output folder
+
+
+"""
+This script is used in incremental runs (where new samples are added to a completed run) to
+compare the merged SNV and indel VCFs of the current run (MergedSNVs_allele1-3.vcf,
+IndelExcludedSNVs_allele1-3.vcf and MergedIndels.vcf) with those of the previous run. The
+variants (CHROM, POS, REF, ALT) of each current VCF which were not in the same VCF of the
+previous run are written to the new_variants subfolder of the output folder, and the rest
+to the previous_variants subfolder, with the same file names (and a compressed and indexed
+copy, .sorted.vcf.gz, for Platypus). New variants need to be genotyped in all the samples,
+while variants of the previous run only need to be genotyped in the new samples. The VCFs
+are processed by SOMATYPUS_PROCESSES processes.
+"""
+
+
+import sys
+import os
+import re
+from itertools import izip
+from somatypuslib.vcf import merge_sorted, group_by_position
+from somatypuslib.bgzf import IndexedVcfWriter
+from somatypuslib.parallel import map_tasks
+from somatypuslib.telemetry import record_counts
+
+
+# Merged VCF files
+MERGEDFILES = ['MergedSNVs_allele1.vcf', 'MergedSNVs_allele2.vcf', 'MergedSNVs_allele3.vcf',
+               'IndelExcludedSNVs_allele1.vcf', 'IndelExcludedSNVs_allele2.vcf', 'IndelExcludedSNVs_allele3.vcf',
+               'MergedIndels.vcf']
+
+
+# If not 3 arguments: print help
+if len(sys.argv) != 4:
+    print '\nSomatypus_SplitNewVariants.py: Splits the merged variants of an incremental run into variants new to the run'
+    print '                               and variants of the previous run.'
+    print '                               Variants are written to the subfolders new_variants and previous_variants'
+    print '                               of the output folder (with a compressed and indexed copy, .sorted.vcf.gz).'
+    print '                        Input: Path to folder with the merged VCF files of the previous run.'
+    print '                               Path to folder with the merged VCF files of the current run.'
+    print '                               Path to (existing) output folder.'
+    print '                        Usage: Somatypus_SplitNewVariants.py /path/to/previous/5-7_merged /path/to/5-7_merged /path/to/outDir\n'
+    sys.exit(0)
+
+
+script, previousDir, currentDir, outDir = sys.argv
+
+
+# Create output subfolders
+for subDir in ('new_variants', 'previous_variants'):
+    if not os.path.isdir(os.path.join(outDir, subDir)):
+        os.mkdir(os.path.join(outDir, subDir))
+
+
+# Open an output VCF, together with its compressed and indexed copy (.sorted.vcf.gz)
+def open_output(outFile):
+    return IndexedVcfWriter(outFile[:-4] + '.sorted.vcf.gz', outFile)
+
+
+# Write the variants of a current VCF to the new or previous variants file
+# Returns the numbers of new and previous variants
+def split_file(name):
+    previousFile = os.path.join(previousDir, name)
+    currentFile = os.path.join(currentDir, name)
+    vcfFiles = [currentFile]
+    if os.path.exists(previousFile):
+        vcfFiles.append(previousFile)
+    new = 0
+    previous = 0
+    with open_output(os.path.join(outDir, 'new_variants', name)) as outNew, \
+         open_output(os.path.join(outDir, 'previous_variants', name)) as outPrevious:
+        for group in group_by_position(merge_sorted(vcfFiles)):
+            # Variants (REF, ALT) at this position in the previous VCF (file 1)
+            previousIds = set(tuple(rec[5].split('\t', 5)[3:5]) for rec in group if rec[2] == 1)
+            for rec in group:
+                if rec[2] == 0:
+                    if tuple(rec[5].split('\t', 5)[3:5]) in previousIds:
+                        outPrevious.write(rec[5])
+                        previous = previous + 1
+                    else:
+                        outNew.write(rec[5])
+                        new = new + 1
+    return new, previous
+
+
+names = [name for name in MERGEDFILES if os.path.exists(os.path.join(currentDir, name))]
+for name, (new, previous) in izip(names, map_tasks(split_file, names)):
+    print '\nInput file:  ', os.path.join(currentDir, name)
+    print new, 'new variants,', previous, 'variants of the previous run'
+    record_counts(new_variants=new, previous_variants=previous)
+
+print '\nDone\n'
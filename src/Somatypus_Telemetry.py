@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_Telemetry.py
+# Measures the resources used by the pipeline commands and steps, and writes the run report
+# Called by measure(), start_stage(), end_stage() and the core pipeline script
+
+# INPUT
+# mode: 'run', 'stage' or 'report'
+# telemetryFile: path to telemetry file
+# (run mode) stage: step index; label: detail of the command (such as the sample), or -; command and its arguments
+# (stage mode) stage: step index (or range); event: 'start' or 'end'; pid: process ID of the shell running the step;
+#              (end) paths to the output files of the step
+# (report mode) outPrefix: prefix of the output report files (.json and .tsv)
+
+
+"""
+This script is used to record the resources used by a pipeline run in a telemetry file
+(one JSON record per line; see somatypuslib/telemetry.py). In run mode, it runs a command
+and records its wall time, CPU time, peak memory (maximum resident set size), bytes read
+and written, exit status and (for Somatypus scripts) record counts. If the environment
+variable SOMATYPUS_PROFILE names a folder, Somatypus scripts are run under cProfile, and
+their profiles are written to that folder; profiled scripts are run with a single process
+(SOMATYPUS_PROCESSES=1), as the functions of a script run by cProfile cannot be sent to a
+process pool. In stage mode, it records the start or end of a step, with the CPU time and
+bytes read and written so far by the shell running it (including its finished commands)
+and, at the end, the total size of the step's output files. In report mode, it summarises
+the last completed execution of each step, and its commands, in a JSON and a TSV report.
+"""
+
+
+import sys
+import os
+import re
+import time
+import json
+import tempfile
+from distutils.spawn import find_executable
+from somatypuslib.telemetry import COUNTSVAR, read_counts, process_io, process_cpu, append_record, read_records
+
+
+# Columns of the TSV report
+COLUMNS = ['level', 'stage', 'label', 'command', 'wall_s', 'user_s', 'system_s', 'peak_rss_kb',
+           'read_bytes', 'write_bytes', 'output_bytes', 'status', 'counts']
+
+
+# If not enough arguments: print help
+if len(sys.argv) < 4 or sys.argv[1] not in ('run', 'stage', 'report') or \
+   (sys.argv[1] == 'run' and len(sys.argv) < 6) or (sys.argv[1] == 'stage' and len(sys.argv) < 6):
+    print '\nSomatypus_Telemetry.py: Measures the resources used by the pipeline commands and steps, and writes the run report.'
+    print '                 Input: Mode (run, stage or report).'
+    print '                        Path to telemetry file.'
+    print '                        Run mode: step index, label (or -), and command to run.'
+    print '                        Stage mode: step index, event (start or end), PID of the shell running the step,'
+    print '                                    and (end) paths to the output files of the step.'
+    print '                        Report mode: prefix of the output report files (.json and .tsv).'
+    print '                 Usage: Somatypus_Telemetry.py run /path/to/telemetry.jsonl 9 - Platypus.py callVariants ...'
+    print '                        Somatypus_Telemetry.py stage /path/to/telemetry.jsonl 9 start $BASHPID'
+    print '                        Somatypus_Telemetry.py report /path/to/telemetry.jsonl /path/to/run_report\n'
+    sys.exit(0)
+
+
+mode = sys.argv[1]
+telemetryFile = sys.argv[2]
+run = os.environ.get('SOMATYPUS_RUN', '')
+
+
+# Run a command and record its resources (the exit status of the command is returned)
+def run_command(stage, label, args):
+    command = os.path.basename(args[0])
+    countsFd, countsFile = tempfile.mkstemp(prefix='counts_', dir=os.path.dirname(os.path.abspath(telemetryFile)))
+    os.close(countsFd)
+
+    # Run Somatypus scripts under cProfile if a profiles folder is given (in a single process,
+    # as cProfile runs the script as its own __main__ module, whose functions cannot be pickled)
+    profileDir = os.environ.get('SOMATYPUS_PROFILE', '')
+    profiled = False
+    if os.path.isdir(profileDir) and re.match(r'Somatypus_.*\.py$', command) and find_executable(args[0]):
+        profile = os.path.join(profileDir, '_'.join([stage, label.replace('/', '_'), command[:-3], str(os.getpid())]) + '.prof')
+        args = [sys.executable, '-m', 'cProfile', '-o', profile, find_executable(args[0])] + args[1:]
+        profiled = True
+
+    start = time.time()
+    readStart, writeStart = process_io()
+    pid = os.fork()
+    if pid == 0:
+        os.environ[COUNTSVAR] = countsFile
+        if profiled:
+            os.environ['SOMATYPUS_PROCESSES'] = '1'
+        try:
+            os.execvp(args[0], args)
+        except OSError as e:
+            sys.stderr.write(args[0] + ': ' + e.strerror + '\n')
+        os._exit(127)
+    pid, status, usage = os.wait4(pid, 0)
+    wall = time.time() - start
+    readEnd, writeEnd = process_io()
+    if os.WIFEXITED(status):
+        status = os.WEXITSTATUS(status)
+    else:
+        status = 128 + os.WTERMSIG(status)
+
+    record = {'type': 'command', 'run': run, 'stage': stage, 'label': label, 'command': command,
+              'start': start, 'wall': wall, 'user': usage.ru_utime, 'system': usage.ru_stime,
+              'peak_rss_kb': usage.ru_maxrss, 'status': status, 'counts': read_counts(countsFile),
+              'read_bytes': None if readStart is None else readEnd - readStart,
+              'write_bytes': None if writeStart is None else writeEnd - writeStart}
+    os.remove(countsFile)
+    append_record(telemetryFile, record)
+    return status
+
+
+# Record the start or end of a step
+def record_stage(stage, event, pid, outputs):
+    user, system = process_cpu(pid)
+    readBytes, writeBytes = process_io(pid)
+    record = {'type': 'stage', 'run': run, 'stage': stage, 'event': event, 'time': time.time(),
+              'user': user, 'system': system, 'read_bytes': readBytes, 'write_bytes': writeBytes}
+    if event == 'end':
+        record['output_bytes'] = sum(os.path.getsize(path) for path in outputs if os.path.isfile(path))
+    append_record(telemetryFile, record)
+
+
+# Difference between two values that may be missing
+def delta(end, start):
+    if end is None or start is None:
+        return None
+    return end - start
+
+
+# Returns the summary of the last completed execution of each step, with its commands
+def summarise(records):
+    stages = {}
+    for rec in records:
+        if rec['type'] == 'stage' and rec['event'] == 'end':
+            if rec['stage'] not in stages or rec['time'] >= stages[rec['stage']]['end']['time']:
+                stages[rec['stage']] = {'end': rec}
+    for stage, summary in stages.items():
+        end = summary['end']
+        starts = [rec for rec in records if rec['type'] == 'stage' and rec['event'] == 'start' and
+                  rec['stage'] == stage and rec['run'] == end['run'] and rec['time'] <= end['time']]
+        start = max(starts, key=lambda rec: rec['time']) if starts else end
+        commands = [rec for rec in records if rec['type'] == 'command' and rec['stage'] == stage and
+                    rec['run'] == end['run'] and start['time'] <= rec['start'] <= end['time']]
+        commands.sort(key=lambda rec: rec['start'])
+        peaks = [rec['peak_rss_kb'] for rec in commands]
+        counts = {}
+        for rec in commands:
+            for key, value in rec['counts'].items():
+                counts[key] = counts.get(key, 0) + value
+        summary.clear()
+        summary.update({'stage': stage, 'run': end['run'], 'wall_s': end['time'] - start['time'],
+                        'user_s': delta(end['user'], start['user']), 'system_s': delta(end['system'], start['system']),
+                        'peak_rss_kb': max(peaks) if peaks else None,
+                        'read_bytes': delta(end['read_bytes'], start['read_bytes']),
+                        'write_bytes': delta(end['write_bytes'], start['write_bytes']),
+                        'output_bytes': end['output_bytes'], 'counts': counts,
+                        'commands': [{'label': rec['label'], 'command': rec['command'], 'wall_s': rec['wall'],
+                                      'user_s': rec['user'], 'system_s': rec['system'],
+                                      'peak_rss_kb': rec['peak_rss_kb'], 'read_bytes': rec['read_bytes'],
+                                      'write_bytes': rec['write_bytes'], 'status': rec['status'],
+                                      'counts': rec['counts']} for rec in commands]})
+    # Steps in pipeline order (by their first step index)
+    return sorted(stages.values(), key=lambda s: int(s['stage'].split('-')[0]))
+
+
+# Format a value of the TSV report
+def tsv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        return '%.3f' % value
+    if isinstance(value, dict):
+        return ','.join(key + '=' + str(value[key]) for key in sorted(value))
+    return str(value)
+
+
+if mode == 'run':
+    sys.exit(run_command(sys.argv[3], sys.argv[4], sys.argv[5:]))
+
+elif mode == 'stage':
+    record_stage(sys.argv[3], sys.argv[4], sys.argv[5], sys.argv[6:])
+
+else:
+    # (The pipeline writes the report on exit, which may happen before any step has run)
+    outPrefix = sys.argv[3]
+    if not os.path.isfile(telemetryFile):
+        print '\nTelemetry file not found:', telemetryFile
+        print 'No run report written\n'
+        sys.exit(0)
+    stages = summarise(read_records(telemetryFile))
+    totals = {'user_s': sum(s['user_s'] or 0 for s in stages),
+              'system_s': sum(s['system_s'] or 0 for s in stages),
+              'peak_rss_kb': max([s['peak_rss_kb'] for s in stages if s['peak_rss_kb'] is not None] or [None]),
+              'read_bytes': sum(s['read_bytes'] or 0 for s in stages),
+              'write_bytes': sum(s['write_bytes'] or 0 for s in stages),
+              'output_bytes': sum(s['output_bytes'] or 0 for s in stages)}
+    with open(outPrefix + '.json', 'w') as out:
+        json.dump({'stages': stages, 'total': totals}, out, indent=1, sort_keys=True)
+        out.write('\n')
+    with open(outPrefix + '.tsv', 'w') as out:
+        out.write('\t'.join(COLUMNS) + '\n')
+        for s in stages:
+            out.write('\t'.join(tsv_value(v) for v in ['stage', s['stage'], '', ''] +
+                                [s[col] for col in COLUMNS[4:11]] + ['', s['counts']]) + '\n')
+            for c in s['commands']:
+                out.write('\t'.join(tsv_value(v) for v in ['command', s['stage'], c['label'], c['command']] +
+                                    [c[col] for col in COLUMNS[4:10]] + [None, c['status'], c['counts']]) + '\n')
+    print '\nTelemetry file:', telemetryFile
+    print 'Run report:    ', outPrefix + '.json'
+    print '               ', outPrefix + '.tsv'
+    print len(stages), 'steps reported'
+    print 'Done\n'
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# Somatypus_VariantWindows.py
+# Writes the merged windows around the variants in a set of VCF files, for use as genotyping regions
+# Called by prepare_genotyping()
+
+# INPUT
+# windowSize: size (bp) of the window at each side of a variant
+# outFile: path to output regions file (in BED format if it ends in .bed)
+# vcfFiles: paths to VCF files, or to text files listing them
+
+
+"""
+This script is used to define windows of +/-windowSize bp around every variant in a set of
+VCFs (such as the merged variants), and to merge the overlapping windows, so that they can
+be used as regions for genotyping. The VCFs are merged as a single stream in coordinate
+order (see somatypuslib.vcf), so the windows are generated in order of their start, and
+each window is merged with the previous one while they overlap; only the current merged
+window is kept in memory. Windows start at position 0 at the start of a chromosome.
+Merged windows are written in CHR:START-END format (or BED format), in chromosome order.
+"""
+
+
+import sys
+import os
+import re
+from somatypuslib.vcf import merge_sorted
+from somatypuslib.regions import format_region, is_bed, merge_sorted_regions
+from somatypuslib.telemetry import record_counts
+
+
+# If less than 3 arguments: print help
+if len(sys.argv) < 4 or not sys.argv[1].isdigit():
+    print '\nSomatypus_VariantWindows.py: Writes the merged windows of +/-N bp around the variants in a set of VCF files.'
+    print '                      Input: Window size, N (bp at each side of a variant).'
+    print '                             Path to output regions file (BED format if it ends in .bed).'
+    print '                             Paths to VCF files (.vcf or .vcf.gz), or to text files listing them.'
+    print '                      Usage: Somatypus_VariantWindows.py 200 /path/to/windows.txt /path/to/variants1.vcf /path/to/variants2.vcf ...\n'
+    sys.exit(0)
+
+
+windowSize = int(sys.argv[1])
+outFile = sys.argv[2]
+
+# Input VCFs (files listing VCFs are expanded)
+vcfFiles = []
+for path in sys.argv[3:]:
+    if path.endswith('.vcf') or path.endswith('.vcf.gz'):
+        vcfFiles.append(path)
+    else:
+        with open(path, 'r') as vcfList:
+            vcfFiles.extend(listLine.strip() for listLine in vcfList if listLine.strip() != '')
+vcfFiles = [vcfFile for vcfFile in vcfFiles if os.path.getsize(vcfFile) > 0]
+
+for vcfFile in vcfFiles:
+    print '\nInput file: ', vcfFile
+print 'Output file:', outFile
+print 'Window size: +/-' + str(windowSize) + ' bp'
+
+
+# Windows around the variants, in coordinate order
+counts = {'variants': 0, 'windows': 0}
+def windows():
+    for rec in merge_sorted(vcfFiles):
+        counts['variants'] = counts['variants'] + 1
+        yield rec[4], max(0, rec[1] - windowSize), rec[1] + windowSize
+
+
+# Merge overlapping windows as they are generated
+bed = is_bed(outFile)
+with open(outFile, 'w') as out:
+    for chrom, start, end in merge_sorted_regions(windows()):
+        out.write(format_region(chrom, start, end, bed))
+        counts['windows'] = counts['windows'] + 1
+
+
+print '\n' + str(counts['variants']) + ' variants'
+print str(counts['windows']) + ' merged windows written'
+record_counts(variants=counts['variants'], windows_written=counts['windows'])
+print 'Done\n'
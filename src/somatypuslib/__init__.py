@@ -0,0 +1,11 @@
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# somatypuslib
+# Shared code used by the Somatypus scripts in this folder
+
+
+"""
+Library of functions shared by the Somatypus scripts. The scripts in the src folder can
+import it directly, since Python adds the folder of the running script to the module path.
+"""
@@ -0,0 +1,420 @@
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# somatypuslib/bgzf.py
+# BGZF compression and tabix indexing of coordinate-sorted VCF files
+
+
+"""
+A BGZF (blocked gzip) writer and a tabix (.tbi) index builder, producing the same kind of
+files as 'bgzip' and 'tabix -p vcf', so that sorted VCFs can be compressed and indexed for
+Platypus as they are written, without calling external tools, and a reader of BGZF and gzip
+files. Compression is done by zlib; the index follows the SAM/BAM specification (binning
+scheme and 16 kb linear index).
+
+BGZF blocks are independent, so they are compressed (and decompressed) by a pool of
+threads; zlib releases the interpreter lock while it works. The number of threads is taken
+from the environment variable SOMATYPUS_THREADS (set by the pipeline to the -c value).
+"""
+
+
+import os
+import struct
+import zlib
+from array import array
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+
+# Maximum uncompressed data per BGZF block (as used by htslib)
+BLOCK_SIZE = 0xff00
+
+# Empty BGZF block marking the end of a file
+EOF_BLOCK = '\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00\x42\x43\x02\x00\x1b\x00' \
+            '\x03\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+
+# Tabix constants: linear index window size (bits), binning levels, pseudo-bin with
+# reference statistics, and minimum compressed span (bytes) of a bin not merged into its parent
+LINEAR_SHIFT = 14
+LEVELS = 5
+META_BIN = 37450
+MIN_BIN_SPAN = 0x10000
+
+# Number of threads for compressing and decompressing BGZF blocks
+THREADS = max(1, int(os.environ.get('SOMATYPUS_THREADS', '1')))
+
+# Size of the chunks read from compressed files (bytes)
+READ_SIZE = 1 << 20
+
+
+def _block(data, level):
+    """Returns a BGZF block containing the given data."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    header = struct.pack('<BBBBIBBHBBHH', 0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, 66, 67, 2,
+                         len(compressed) + 25)
+    footer = struct.pack('<Ii', zlib.crc32(data) & 0xffffffff, len(data))
+    return header + compressed + footer
+
+
+class BgzfWriter(object):
+    """File-like object writing BGZF-compressed data, with blocks compressed by a pool of
+    threads if threads > 1. tell() returns the position of the next byte as (block number
+    << 16 | offset within the block), which virtual_offset() converts into the virtual file
+    offset (compressed block offset << 16 | offset within the block) once the preceding
+    blocks have been written."""
+
+    def __init__(self, path, level=6, threads=None):
+        self.file = open(path, 'wb')
+        self.level = level
+        self.buffer = []
+        self.size = 0
+        self.blocks = 0
+        # Compressed offset of the start of each block
+        self.starts = array('L', [0])
+        threads = THREADS if threads is None else threads
+        self.pool = ThreadPool(threads) if threads > 1 else None
+        self.queue = deque()
+        self.maxQueue = 4 * threads
+
+    def write(self, data):
+        while self.size + len(data) >= BLOCK_SIZE:
+            split = BLOCK_SIZE - self.size
+            self.buffer.append(data[:split])
+            self.size = BLOCK_SIZE
+            self.flush()
+            data = data[split:]
+        if data:
+            self.buffer.append(data)
+            self.size = self.size + len(data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        if self.size > 0:
+            data = ''.join(self.buffer)
+            if self.pool is None:
+                self._write_block(_block(data, self.level))
+            else:
+                self.queue.append(self.pool.apply_async(_block, (data, self.level)))
+                while len(self.queue) > self.maxQueue:
+                    self._write_block(self.queue.popleft().get())
+            self.blocks = self.blocks + 1
+            self.buffer = []
+            self.size = 0
+
+    def _write_block(self, block):
+        self.file.write(block)
+        self.starts.append(self.starts[-1] + len(block))
+
+    def _drain(self):
+        while self.queue:
+            self._write_block(self.queue.popleft().get())
+
+    def tell(self):
+        return self.blocks << 16 | self.size
+
+    def virtual_offset(self, position):
+        """Converts a position returned by tell() into a virtual file offset."""
+        if len(self.starts) <= position >> 16:
+            self._drain()
+        return self.starts[position >> 16] << 16 | position & 0xffff
+
+    def close(self):
+        self.flush()
+        self._drain()
+        self.file.write(EOF_BLOCK)
+        self.file.close()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _inflate(member):
+    """Returns the decompressed data of a complete gzip member (such as a BGZF block)."""
+    return zlib.decompress(member, 31)
+
+
+def _bgzf_blocks(f):
+    """Yields the BGZF blocks of a file, or raises ValueError if a block is not in BGZF
+    format (a gzip member with a BC extra subfield holding its size)."""
+    while True:
+        header = f.read(18)
+        if not header:
+            return
+        if len(header) < 18 or header[:4] != '\x1f\x8b\x08\x04' or header[12:16] != 'BC\x02\x00':
+            raise ValueError('Not a BGZF block')
+        size = struct.unpack('<H', header[16:18])[0] + 1
+        yield header + f.read(size - 18)
+
+
+def is_bgzf(path):
+    """Returns True if the file starts with a BGZF block."""
+    with open(path, 'rb') as f:
+        header = f.read(18)
+    return header[:4] == '\x1f\x8b\x08\x04' and header[12:16] == 'BC\x02\x00'
+
+
+class CompressedReader(object):
+    """Iterable over the lines of a BGZF or gzip file. BGZF blocks are decompressed by a
+    pool of threads if threads > 1; other gzip files (possibly of several members) are
+    decompressed as a single stream. seek() moves to an offset in the uncompressed data,
+    skipping whole BGZF blocks by their stored sizes without decompressing them."""
+
+    def __init__(self, path, threads=None):
+        threads = THREADS if threads is None else threads
+        self.bgzf = is_bgzf(path)
+        self.file = open(path, 'rb')
+        self.pool = ThreadPool(threads) if self.bgzf and threads > 1 else None
+        self.maxQueue = 4 * threads
+        self._lines = self._read_lines(0)
+
+    def _skip_blocks(self, offset):
+        # Moves the file to the BGZF block containing an uncompressed offset, and returns
+        # the offset within that block
+        self.file.seek(0)
+        while True:
+            start = self.file.tell()
+            header = self.file.read(18)
+            if len(header) < 18:
+                return 0
+            size = struct.unpack('<H', header[16:18])[0] + 1
+            self.file.seek(start + size - 4)
+            blockSize = struct.unpack('<I', self.file.read(4))[0]
+            if offset < blockSize:
+                self.file.seek(start)
+                return offset
+            offset = offset - blockSize
+
+    def _chunks(self, offset):
+        if self.bgzf:
+            skip = self._skip_blocks(offset)
+            if self.pool is None:
+                chunks = (_inflate(block) for block in _bgzf_blocks(self.file))
+            else:
+                chunks = self._parallel_chunks()
+        else:
+            self.file.seek(0)
+            skip = offset
+            chunks = self._stream_chunks()
+        for chunk in chunks:
+            if skip > 0:
+                chunk, skip = chunk[skip:], max(0, skip - len(chunk))
+            yield chunk
+
+    def _parallel_chunks(self):
+        queue = deque()
+        for block in _bgzf_blocks(self.file):
+            queue.append(self.pool.apply_async(_inflate, (block,)))
+            if len(queue) > self.maxQueue:
+                yield queue.popleft().get()
+        while queue:
+            yield queue.popleft().get()
+
+    def _stream_chunks(self):
+        decompressor = zlib.decompressobj(31)
+        while True:
+            data = self.file.read(READ_SIZE)
+            if not data:
+                break
+            yield decompressor.decompress(data)
+            # A new gzip member starts after the end of the previous one
+            while decompressor.unused_data:
+                data = decompressor.unused_data
+                decompressor = zlib.decompressobj(31)
+                yield decompressor.decompress(data)
+        yield decompressor.flush()
+
+    def _read_lines(self, offset):
+        rest = ''
+        for chunk in self._chunks(offset):
+            if not chunk:
+                continue
+            lines = (rest + chunk).splitlines(True)
+            rest = lines.pop() if not lines[-1].endswith('\n') else ''
+            for line in lines:
+                yield line
+        if rest:
+            yield rest
+
+    def seek(self, offset):
+        """Moves to an offset in the uncompressed data."""
+        self._lines = self._read_lines(offset)
+
+    def __iter__(self):
+        return self._lines
+
+    def close(self):
+        self.file.close()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def reg2bin(beg, end):
+    """Returns the smallest bin containing the 0-based interval [beg, end)."""
+    end = end - 1
+    if beg >> 14 == end >> 14: return 4681 + (beg >> 14)
+    if beg >> 17 == end >> 17: return 585 + (beg >> 17)
+    if beg >> 20 == end >> 20: return 73 + (beg >> 20)
+    if beg >> 23 == end >> 23: return 9 + (beg >> 23)
+    if beg >> 26 == end >> 26: return 1 + (beg >> 26)
+    return 0
+
+
+class TabixIndex(object):
+    """Tabix index for a coordinate-sorted, BGZF-compressed VCF, built by adding the
+    0-based interval and virtual offsets of each record in file order. The index of each
+    chromosome is packed into bytes once the next chromosome starts. If resolve is given,
+    the offsets added are positions that resolve() converts into virtual offsets when the
+    chromosome is packed (as done with BgzfWriter.tell and BgzfWriter.virtual_offset)."""
+
+    def __init__(self, resolve=None):
+        self.names = []
+        self.packed = []
+        self.ref = None
+        self.resolve = resolve
+
+    def add(self, chrom, beg, end, start, stop):
+        """Adds a record spanning [beg, end) on chrom, stored at virtual offsets [start, stop)."""
+        if not self.names or self.names[-1] != chrom:
+            if chrom in self.names:
+                raise ValueError('Chromosome ' + chrom + ' is not contiguous in the file')
+            self._pack()
+            self.names.append(chrom)
+            self.ref = {'bins': {}, 'linear': [], 'start': start, 'stop': stop, 'count': 0}
+        ref = self.ref
+        chunks = ref['bins'].setdefault(reg2bin(beg, end), [])
+        if chunks and chunks[-1][1] == start:
+            chunks[-1][1] = stop
+        else:
+            chunks.append([start, stop])
+        linear = ref['linear']
+        last = (end - 1) >> LINEAR_SHIFT
+        if len(linear) <= last:
+            linear.extend([None] * (last + 1 - len(linear)))
+        for window in xrange(beg >> LINEAR_SHIFT, last + 1):
+            if linear[window] is None:
+                linear[window] = start
+        ref['stop'] = stop
+        ref['count'] = ref['count'] + 1
+
+    def _compress(self, bins):
+        """Merges bins spanning less than MIN_BIN_SPAN compressed bytes into their parent
+        bins, and adjacent chunks starting in the same BGZF block (as done by htslib)."""
+        for level in range(LEVELS, 0, -1):
+            first = ((1 << 3 * level) - 1) // 7
+            for bin in sorted(b for b in bins if first <= b < first + (1 << 3 * level)):
+                chunks = bins[bin]
+                chunks.sort()
+                parent = (bin - 1) >> 3
+                if (chunks[-1][1] >> 16) - (chunks[0][0] >> 16) < MIN_BIN_SPAN and parent in bins:
+                    bins[parent].extend(chunks)
+                    del bins[bin]
+        for bin in bins:
+            chunks = sorted(bins[bin])
+            merged = [chunks[0]]
+            for start, stop in chunks[1:]:
+                if merged[-1][1] >> 16 >= start >> 16:
+                    merged[-1][1] = max(merged[-1][1], stop)
+                else:
+                    merged.append([start, stop])
+            bins[bin] = merged
+
+    def _pack(self):
+        """Packs the index of the current chromosome into bytes."""
+        ref = self.ref
+        if ref is None:
+            return
+        resolve = self.resolve
+        if resolve is not None:
+            for chunks in ref['bins'].values():
+                for chunk in chunks:
+                    chunk[0] = resolve(chunk[0])
+                    chunk[1] = resolve(chunk[1])
+            ref['start'] = resolve(ref['start'])
+            ref['stop'] = resolve(ref['stop'])
+            ref['linear'] = [None if offset is None else resolve(offset) for offset in ref['linear']]
+        self._compress(ref['bins'])
+        data = [struct.pack('<i', len(ref['bins']) + 1)]
+        for bin in sorted(ref['bins']):
+            chunks = ref['bins'][bin]
+            data.append(struct.pack('<Ii', bin, len(chunks)))
+            data.extend(struct.pack('<QQ', start, stop) for start, stop in chunks)
+        data.append(struct.pack('<IiQQQQ', META_BIN, 2, ref['start'], ref['stop'], ref['count'], 0))
+        # Empty windows take the offset of the next window (the last window is never empty)
+        linear = ref['linear']
+        for i in xrange(len(linear) - 2, -1, -1):
+            if linear[i] is None:
+                linear[i] = linear[i + 1]
+        data.append(struct.pack('<i', len(linear)))
+        data.append(struct.pack('<%dQ' % len(linear), *linear))
+        self.packed.append(''.join(data))
+        self.ref = None
+
+    def write(self, path):
+        """Writes the BGZF-compressed index to path."""
+        self._pack()
+        names = ''.join(name + '\x00' for name in self.names)
+        header = struct.pack('<iiiiiiii', len(self.names), 2, 1, 2, 0, ord('#'), 0, len(names))
+        with BgzfWriter(path) as out:
+            out.write('TBI\x01' + header + names + ''.join(self.packed) + struct.pack('<Q', 0))
+
+
+class IndexedVcfWriter(object):
+    """Writes coordinate-sorted VCF lines to a BGZF-compressed file (such as the output of
+    'bgzip') and, when closed, its tabix index (path + '.tbi'). If plainPath is given, the
+    lines are also written to that uncompressed file."""
+
+    def __init__(self, path, plainPath=None):
+        self.path = path
+        self.bgzf = BgzfWriter(path)
+        self.index = TabixIndex(self.bgzf.virtual_offset)
+        self.plain = open(plainPath, 'w') if plainPath is not None else None
+        self.pending = None
+
+    def _add_pending(self):
+        # A record is indexed once its end offset is known (after the next write or the last block)
+        if self.pending is not None:
+            chrom, beg, end, start = self.pending
+            self.index.add(chrom, beg, end, start, self.bgzf.tell())
+            self.pending = None
+
+    def write(self, line):
+        if self.plain is not None:
+            self.plain.write(line)
+        self._add_pending()
+        start = self.bgzf.tell()
+        self.bgzf.write(line)
+        if not line.startswith('#'):
+            col = line.split('\t', 4)
+            beg = int(col[1]) - 1
+            self.pending = (col[0], beg, beg + len(col[3]), start)
+
+    def close(self):
+        if self.plain is not None:
+            self.plain.close()
+        self.bgzf.flush()
+        self._add_pending()
+        self.bgzf.close()
+        self.index.write(self.path + '.tbi')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
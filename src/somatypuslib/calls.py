@@ -0,0 +1,147 @@
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# somatypuslib/calls.py
+# Splitting, flag filtering, indel flagging and merging rules for Platypus calls
+
+
+"""
+The rules applied to individual Platypus calls by steps 3-7 of the pipeline, shared by the
+scripts that run each step separately and by Somatypus_SplitFlagMerge.py, which runs them
+all on a single stream of calls:
+splitting multi-allelic calls and MNPs into bi-allelic SNVs/indels (step 3), discarding
+calls with quality flags (steps 4, 17 and 18), marking windows around indels for flagging
+nearby SNVs (step 5), and selecting and merging SNVs and indels (steps 6 and 7).
+"""
+
+
+from somatypuslib.vcf import VcfRecord
+
+
+# Number of bases flagged at each side of an indel footprint
+WINDOW = 5
+
+# INFO keys with one value per ALT allele in Platypus calls
+ALLELE_KEYS = frozenset(['FR', 'NF', 'NR', 'PP', 'TR'])
+
+
+def has_bad_flag(filter):
+    """Returns True if a FILTER value contains any of the flags badReads, MQ, strandBias, SC or QD."""
+    return 'badReads' in filter or 'MQ' in filter or 'strandBias' in filter or 'SC' in filter or 'QD' in filter
+
+
+def split_multiallelic(rec):
+    """Returns the lines of the bi-allelic calls into which a multi-allelic call is split,
+    with the values of this allele for the allele-specific INFO keys (ALLELE_KEYS) and the
+    sample NR/NV values, and the INFO flag FromComplex."""
+    lines = []
+    # INFO values, split into the values of each allele for the allele-specific keys
+    info = []
+    for elem in rec.info.split(';'):
+        key = elem.split('=', 1)[0]
+        if key in ALLELE_KEYS and key != elem:
+            info.append((key + '=', elem[len(key) + 1:].split(',')))
+        else:
+            info.append((elem, None))
+    nrIndex = rec.format_index('NR')
+    nvIndex = rec.format_index('NV')
+    for ind, alt in enumerate(rec.alts):
+        # Create the new info, keeping the values of this allele
+        newInfo = [elem if values is None else elem + (values[ind] if len(values) > ind else values[0])
+                   for elem, values in info]
+        newInfo = ';'.join(newInfo + ['FromComplex'])
+
+        # Create the new sample fields, keeping the NR and NV values of this allele
+        newRest = []
+        for elem in rec.samples:
+            stats = elem.split(':')
+            nr = stats[nrIndex].split(',')
+            nv = stats[nvIndex].split(',')
+            # Normal cases
+            if len(nr) > ind and len(nv) > ind:
+                stats[nrIndex] = nr[ind]
+                stats[nvIndex] = nv[ind]
+            # Cases where Platypus gets no data: './.:0,0,0:0:0:0:0'
+            else:
+                stats[nrIndex] = nr[0]
+                stats[nvIndex] = nv[0]
+            newRest.append(':'.join(stats))
+
+        newLine = '\t'.join([ rec.chrom, rec.pos, rec.id, rec.ref, alt, rec.qual, rec.filter,
+                              newInfo, rec.format, '\t'.join(newRest) ])
+        lines.append(newLine + '\n')
+    return lines
+
+
+def is_mnp(rec):
+    """Returns True if a bi-allelic call is an MNP (REF and ALT of equal length >1)."""
+    return len(rec.ref) == len(rec.alt) and len(rec.ref) != 1
+
+
+def split_mnp(rec):
+    """Returns the lines of the SNVs into which an MNP call is split (one per differing base)."""
+    lines = []
+    pos = int(rec.pos)
+    rest = [ rec.qual, rec.filter, rec.info, rec.format, '\t'.join(rec.samples) ]
+    for ind, (refBase, altBase) in enumerate(zip(rec.ref, rec.alt)):
+        if refBase != altBase:
+            newLine = '\t'.join([ rec.chrom, str(pos + ind), rec.id, refBase, altBase ] + rest)
+            lines.append(newLine + '\n')
+    return lines
+
+
+def split_call(rec, counts=None):
+    """Returns the lines into which a call is split: multi-allelic calls are split into
+    bi-allelic calls, and then MNPs (including those from multi-allelic calls) into SNVs.
+    If a counts dict is given, the numbers of multi-allelic calls and MNPs split are added
+    to its 'multiallelic' and 'mnp' values."""
+    if ',' in rec.alt:
+        lines = split_multiallelic(rec)
+        if counts is not None:
+            counts['multiallelic'] = counts['multiallelic'] + 1
+    else:
+        lines = [rec.line]
+    result = []
+    for line in lines:
+        call = rec if line is rec.line else VcfRecord(line)
+        if is_mnp(call):
+            result.extend(split_mnp(call))
+            if counts is not None:
+                counts['mnp'] = counts['mnp'] + 1
+        else:
+            result.append(line)
+    return result
+
+
+def indel_window(rec):
+    """Returns the first and last positions of the window flagged around an indel call: its
+    footprint (the deleted bases, for deletions) plus WINDOW bases at each side."""
+    # If deletion: footprint is the length of the REF, only downstream
+    if len(rec.ref) > len(rec.alt):
+        ftprint = len(rec.ref) - 1
+    else:
+        ftprint = 0
+    return int(rec.pos) - WINDOW, int(rec.pos) + ftprint + WINDOW
+
+
+def variant_id(rec):
+    """Returns the identifier of a bi-allelic call, in CHROM:POS,REF>ALT format."""
+    return rec.chrom + ':' + rec.pos + ',' + rec.ref + '>' + rec.alt
+
+
+def is_selected_indel(rec):
+    """Returns True for bi-allelic indels without flags badReads, MQ, strandBias, SC, or QD."""
+    return ',' not in rec.alt and len(rec.ref) != len(rec.alt) and not has_bad_flag(rec.filter)
+
+
+def write_alleles(snvs, out1, out2, out3):
+    """Writes de-duplicated SNVs at one position (a dict of lines by variant_id) to the output
+    files of alleles 1, 2 and 3 (in the order of their REF>ALT values; a fourth allele goes
+    again to allele 2)."""
+    for i, id in enumerate(sorted(snvs)):
+        if i == 0:
+            out1.write(snvs[id])
+        elif i % 2 == 1:
+            out2.write(snvs[id])
+        else:
+            out3.write(snvs[id])
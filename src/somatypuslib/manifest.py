@@ -0,0 +1,116 @@
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# somatypuslib/manifest.py
+# Recording and checking the parameters and files of completed units of pipeline work
+
+
+"""
+A manifest of the completed units of work of a pipeline run (steps, or the calling of a
+single sample), used to decide which work is still up to date when a run is resumed.
+
+The manifest is a text file with one line per recorded unit, holding its key (such as
+'9', or '1:sample001'), the MD5 hash of the parameters it was run with, and a JSON list of
+its files, as [role, path, size, modification time, MD5 hash]. Output files ('out') are
+identified by the MD5 hash of their content; external input files ('ext', such as BAMs
+and the reference genome) only by their size and modification time, as hashing them would
+take too long. Lines are only ever appended (in a single write, so that concurrent jobs
+can record their work in the same manifest), and the last line of a key is the valid one.
+"""
+
+
+import os
+import json
+import hashlib
+
+
+# Size of the chunks read for hashing (bytes)
+CHUNKSIZE = 1 << 20
+
+
+def file_md5(path):
+    """Returns the MD5 hash (hexadecimal) of the content of a file."""
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(CHUNKSIZE)
+            if not data:
+                break
+            md5.update(data)
+    return md5.hexdigest()
+
+
+def params_md5(params):
+    """Returns the MD5 hash (hexadecimal) of a parameters string."""
+    return hashlib.md5(params).hexdigest()
+
+
+class Manifest(object):
+    """The units of work recorded in a manifest file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        # MD5 hashes of the files hashed by this object, by (path, size, modification time)
+        self._hashes = {}
+        if os.path.exists(path):
+            with open(path, 'r') as manifest:
+                for line in manifest:
+                    col = line.rstrip('\n').split('\t')
+                    # Skip lines truncated by an interrupted write
+                    if len(col) != 3:
+                        continue
+                    try:
+                        files = json.loads(col[2])
+                    except ValueError:
+                        continue
+                    self.entries[col[0]] = (col[1], files)
+
+    def _md5(self, path, size, mtime):
+        key = (path, size, mtime)
+        if key not in self._hashes:
+            self._hashes[key] = file_md5(path)
+        return self._hashes[key]
+
+    def _describe(self, role, path):
+        stat = os.stat(path)
+        md5 = self._md5(path, stat.st_size, stat.st_mtime) if role == 'out' else None
+        return [role, path, stat.st_size, stat.st_mtime, md5]
+
+    def record(self, key, params, outputs, externals=()):
+        """Appends a line recording a unit of work, with its parameters string, output
+        files and external input files."""
+        # Outputs recorded earlier with the same size and modification time are not hashed again
+        for params_, files in self.entries.values():
+            for role, path, size, mtime, md5 in files:
+                if md5 is not None:
+                    self._hashes[(path, size, mtime)] = md5
+        files = [self._describe('ext', path) for path in externals] + \
+                [self._describe('out', path) for path in outputs]
+        self.entries[key] = (params_md5(params), files)
+        line = key + '\t' + params_md5(params) + '\t' + json.dumps(files) + '\n'
+        with open(self.path, 'a') as manifest:
+            manifest.write(line)
+
+    def is_current(self, key, params):
+        """Returns True if a unit of work is recorded with the same parameters string, and
+        all its files are unchanged: output files with the same content, and external
+        input files with the same size and modification time."""
+        if key not in self.entries:
+            return False
+        recordedParams, files = self.entries[key]
+        if recordedParams != params_md5(params):
+            return False
+        for role, path, size, mtime, md5 in files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return False
+            if stat.st_size != size:
+                return False
+            if role == 'ext':
+                if stat.st_mtime != mtime:
+                    return False
+            elif self._md5(path, stat.st_size, stat.st_mtime) != md5:
+                return False
+        return True
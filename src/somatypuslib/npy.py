@@ -0,0 +1,61 @@
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# somatypuslib/npy.py
+# Writing matrices row block by row block to NumPy (.npy) files
+
+
+"""
+A writer of 2-dimensional NumPy arrays in .npy format (version 1.0), whose rows are written
+in blocks as they are computed, so that matrices larger than memory can be written from a
+stream of VCF records. The header is written with room for any number of rows, and updated
+with the final number of rows when the file is closed. The output can be loaded with
+numpy.load(path, mmap_mode='r'), which memory-maps the matrix instead of reading it.
+"""
+
+
+import numpy
+
+
+# Magic string of .npy files (version 1.0)
+MAGIC = '\x93NUMPY\x01\x00'
+
+# Total length of the header (magic string, header length and padded header), in bytes
+HEADERSIZE = 128
+
+
+class NpyWriter(object):
+    """Writes a matrix with a fixed number of columns and a given NumPy type to a .npy file,
+    one block of rows at a time."""
+
+    def __init__(self, path, columns, dtype='uint32'):
+        self.file = open(path, 'wb')
+        self.columns = columns
+        self.dtype = numpy.dtype(dtype).newbyteorder('<')
+        self.rows = 0
+        self._write_header()
+
+    def _write_header(self):
+        header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d, %d), }" % \
+                 (self.dtype.str, self.rows, self.columns)
+        header = header.ljust(HEADERSIZE - len(MAGIC) - 3) + '\n'
+        self.file.seek(0)
+        self.file.write(MAGIC + numpy.array(len(header), dtype='<u2').tostring() + header)
+
+    def write(self, block):
+        """Writes a block of rows (a matrix with the writer's number of columns)."""
+        block = numpy.asarray(block, dtype=self.dtype)
+        if block.ndim != 2 or block.shape[1] != self.columns:
+            raise ValueError('Expected a matrix with %d columns' % self.columns)
+        self.file.write(block.tostring())
+        self.rows = self.rows + block.shape[0]
+
+    def close(self):
+        self._write_header()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
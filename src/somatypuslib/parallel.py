@@ -0,0 +1,47 @@
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# somatypuslib/parallel.py
+# Running independent tasks (such as processing each VCF of a list) in a pool of processes
+
+
+"""
+A helper for running the same function on several independent inputs (typically one VCF
+per sample) in a pool of worker processes. The number of processes is taken from the
+environment variable SOMATYPUS_PROCESSES (set by the pipeline to the number of parallel
+jobs, -t/-c), so that, together with the SOMATYPUS_THREADS compression threads of each
+process, the scripts use the CPUs given to the pipeline. Results are returned in the order
+of the inputs, so the scripts can report them as if the inputs had been processed one by
+one.
+"""
+
+
+import os
+from multiprocessing import Pool
+
+
+# Number of worker processes
+PROCESSES = max(1, int(os.environ.get('SOMATYPUS_PROCESSES', '1')))
+
+
+def map_tasks(function, items, processes=None):
+    """Yields function(item) for each item, in the order of the items. The calls are run in
+    a pool of processes (PROCESSES by default), or in this process if only one process is
+    used or there is only one item. The function must be defined at module level."""
+    items = list(items)
+    processes = PROCESSES if processes is None else processes
+    processes = min(processes, len(items))
+    if processes <= 1:
+        for item in items:
+            yield function(item)
+        return
+    pool = Pool(processes)
+    try:
+        for result in pool.imap(function, items):
+            yield result
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
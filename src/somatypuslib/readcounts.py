@@ -0,0 +1,204 @@
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# somatypuslib/readcounts.py
+# Block-wise evaluation of VAF and coverage rules on the NR/NV values of VCF records
+
+
+"""
+Functions for evaluating read count rules (VAF and coverage thresholds) on blocks of
+Platypus VCF records. The NR (total reads) and NV (reads supporting the variant) values of
+all the samples in a block are parsed into matrices (records x samples), and the rules are
+evaluated over the whole block at once with NumPy. If NumPy is not available, each record
+is evaluated separately in pure Python, with the same results.
+"""
+
+
+from somatypuslib.vcf import VcfRecord
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Number of records evaluated at once
+BLOCKSIZE = 2000
+
+# Platypus FORMAT field; blocks are parsed as matrices only in this format, where NR and NV
+# are the last two values of each sample
+FORMAT = 'GT:GL:GOF:GQ:NR:NV'
+
+# Maximum number of digits of NR/NV values parsed in blocks
+MAXDIGITS = 9
+
+
+def read_counts(line):
+    """Returns the lists of NR and NV values (floats) of the samples in a VCF record."""
+    rec = VcfRecord(line)
+    if not rec.samples:
+        return [], []
+    nr, nv = rec.sample_fields('NR', 'NV')
+    return [float(value) for value in nr], [float(value) for value in nv]
+
+
+def median(l):
+    """Returns the median of a list of numbers, or None if the list is empty."""
+    if len(l) > 1:
+        half = len(l) // 2
+        l = sorted(l)
+        if not len(l) % 2:
+            return (l[half - 1] + l[half]) / 2.0
+        return l[half]
+    elif len(l) == 1:
+        return l[0]
+    else:
+        return None
+
+
+def _integers_before(buf, ends):
+    """Returns the integers written in buf immediately before each position in ends, and
+    the positions of the ':' preceding them, or None if any of them is not a string of (at
+    most MAXDIGITS) digits preceded by ':'."""
+    values = numpy.zeros(len(ends), dtype=numpy.int64)
+    positions = ends - 1
+    active = numpy.arange(len(ends))
+    place = 1
+    for j in range(MAXDIGITS + 1):
+        chars = buf[positions[active]]
+        if j > 0:
+            # Values whose digits have all been read stop at ':'
+            active = active[chars != 58]
+            chars = chars[chars != 58]
+            if len(active) == 0:
+                return values, positions
+        digits = chars.astype(numpy.int64) - 48
+        if j == MAXDIGITS or ((digits < 0) | (digits > 9)).any():
+            return None
+        values[active] = values[active] + digits * place
+        positions[active] = positions[active] - 1
+        place = place * 10
+    return None
+
+
+def _matrices(lines, dtype=float):
+    """Returns the NR and NV matrices (records x samples, of the given NumPy type; floats by
+    default) of a block of VCF records, or None
+    if the records are not all in Platypus format with the same number of samples, or have
+    non-integer NR/NV values. The sample columns of the block are read as a single byte
+    array, where the NV and NR values are parsed backwards from the end of each sample."""
+    columns = []
+    for line in lines:
+        col = line.split('\t', 9)
+        if len(col) < 10 or col[8] != FORMAT:
+            return None
+        columns.append(col[9] if col[9].endswith('\n') else col[9] + '\n')
+    buf = numpy.frombuffer(''.join(columns), dtype=numpy.uint8)
+    # Position of the tab or newline after each sample
+    ends = numpy.flatnonzero((buf == 9) | (buf == 10))
+    numSamples = len(ends) // len(lines)
+    if len(ends) != numSamples * len(lines) or not (buf[ends[numSamples - 1::numSamples]] == 10).all():
+        return None
+    nv = _integers_before(buf, ends)
+    if nv is None:
+        return None
+    nr = _integers_before(buf, nv[1])
+    if nr is None:
+        return None
+    return nr[0].reshape(len(lines), -1).astype(dtype), nv[0].reshape(len(lines), -1).astype(dtype)
+
+
+def count_matrices(lines, dtype='uint32'):
+    """Returns the NR and NV matrices (records x samples, of the given NumPy type) of a block
+    of VCF records with the same number of samples. Records not in Platypus format are
+    parsed one by one. Requires NumPy."""
+    matrices = _matrices(lines, dtype)
+    if matrices is None:
+        counts = [VcfRecord(line).sample_fields('NR', 'NV') for line in lines]
+        matrices = (numpy.array([[int(value) for value in nr] for nr, nv in counts], dtype=dtype),
+                    numpy.array([[int(value) for value in nv] for nr, nv in counts], dtype=dtype))
+    return matrices
+
+
+def _row_medians(values, valid):
+    """Returns the median of the valid values in each row (NaN for rows without any)."""
+    values = numpy.where(valid, values, numpy.nan)
+    values.sort(axis=1)
+    count = valid.sum(axis=1)
+    rows = numpy.arange(values.shape[0])
+    low = values[rows, numpy.maximum(count - 1, 0) // 2]
+    high = values[rows, numpy.maximum(count // 2, 0)]
+    medians = (low + high) / 2.0
+    medians[count == 0] = numpy.nan
+    return medians
+
+
+def high_vaf(lines, maxVaf):
+    """Returns a list saying, for each VCF record, whether its VAF (NV/NR, or 1 if NR is 0)
+    is above maxVaf in all the samples. Records with a VAF not above maxVaf in the first
+    sample are resolved without reading the other samples."""
+    result = [False] * len(lines)
+    candidates = []
+    for i, line in enumerate(lines):
+        rec = VcfRecord(line)
+        samples = rec.samples
+        if samples:
+            values = samples[0].split(':')
+            nr = float(values[rec.format_index('NR')])
+            if nr != 0 and float(values[rec.format_index('NV')]) / nr <= maxVaf:
+                continue
+        candidates.append(i)
+    if candidates:
+        for i, high in zip(candidates, _all_high_vaf([lines[i] for i in candidates], maxVaf)):
+            result[i] = high
+    return result
+
+
+def _all_high_vaf(lines, maxVaf):
+    matrices = _matrices(lines) if numpy is not None else None
+    if matrices is None:
+        result = []
+        for line in lines:
+            nr, nv = read_counts(line)
+            result.append(all((1 if r == 0 else v / r) > maxVaf for r, v in zip(nr, nv)))
+        return result
+    nr, nv = matrices
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        vaf = numpy.where(nr == 0, 1.0, nv / nr)
+    return list((vaf > maxVaf).all(axis=1))
+
+
+def coverage_vaf_pass(lines, minCov, minVaf, maxVaf, minReads):
+    """Returns a list saying, for each VCF record, whether its median NR is at least minCov
+    and its median VAF (over the samples with at least minReads supporting reads) is
+    between minVaf and maxVaf."""
+    matrices = _matrices(lines) if numpy is not None else None
+    if matrices is None:
+        result = []
+        for line in lines:
+            nr, nv = read_counts(line)
+            vaf = [v / r for r, v in zip(nr, nv) if v >= minReads]
+            medianVaf = median(vaf)
+            result.append(median(nr) >= minCov and medianVaf is not None and minVaf <= medianVaf <= maxVaf)
+        return result
+    nr, nv = matrices
+    medianCov = _row_medians(nr, numpy.ones(nr.shape, dtype=bool))
+    supported = nv >= minReads
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        medianVaf = _row_medians(nv / nr, supported)
+    # Comparisons with NaN (no supported samples) are False
+    with numpy.errstate(invalid='ignore'):
+        result = (medianCov >= minCov) & (medianVaf >= minVaf) & (medianVaf <= maxVaf)
+    return list(result)
+
+
+def blocks(lines, size=BLOCKSIZE):
+    """Yields lists of up to size consecutive items from an iterable of lines."""
+    block = []
+    for line in lines:
+        block.append(line)
+        if len(block) == size:
+            yield block
+            block = []
+    if block:
+        yield block
@@ -0,0 +1,186 @@
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# somatypuslib/regions.py
+# Genomic region parsing, and region/variant overlap queries
+
+
+"""
+Functions for reading and merging regions in CHR:START-END format (or BED format) and for
+testing whether a region contains any variant position, or a position lies within any of a
+set of intervals. Regions are handled as 1-based, closed intervals; BED regions (0-based,
+half-open) are converted when they are read and written.
+Positions and intervals are kept as sorted integers per chromosome, so that each query is
+a binary search instead of a scan over all the positions.
+"""
+
+
+from bisect import bisect_left, bisect_right
+from somatypuslib.vcf import VcfReader
+
+
+def parse_region(region):
+    """Returns (chrom, start, end) from a region string in CHR:START-END format."""
+    chrom, startEnd = region.strip().rsplit(':', 1)
+    start, end = startEnd.split('-')
+    return chrom, int(start), int(end)
+
+
+def is_bed(path):
+    """Returns True if a regions file is in BED format (by its extension)."""
+    return path.endswith('.bed')
+
+
+def read_regions(regionsFile, bed=False):
+    """Yields (line, chrom, start, end) for each non-empty line in a regions file (in BED
+    format if bed is True, skipping header lines)."""
+    with open(regionsFile, 'r') as regions:
+        for line in regions:
+            if line.strip() == '':
+                continue
+            if bed:
+                if line.startswith(('#', 'track', 'browser')):
+                    continue
+                cols = line.split('\t', 3)
+                chrom, start, end = cols[0], int(cols[1]) + 1, int(cols[2])
+            else:
+                chrom, start, end = parse_region(line)
+            yield line, chrom, start, end
+
+
+def format_region(chrom, start, end, bed=False):
+    """Returns a regions file line for a region, in CHR:START-END or BED format."""
+    if bed:
+        return chrom + '\t' + str(max(0, start - 1)) + '\t' + str(end) + '\n'
+    return chrom + ':' + str(start) + '-' + str(end) + '\n'
+
+
+class PositionIndex(object):
+    """Sorted variant positions per chromosome, supporting region overlap queries."""
+
+    def __init__(self):
+        self.positions = {}
+
+    def add(self, chrom, pos):
+        if chrom in self.positions:
+            self.positions[chrom].append(pos)
+        else:
+            self.positions[chrom] = [pos]
+
+    def finalise(self):
+        """Sorts the positions of every chromosome; must be called before querying."""
+        for chrom in self.positions:
+            self.positions[chrom].sort()
+        return self
+
+    def count(self):
+        return sum(len(p) for p in self.positions.values())
+
+    def overlaps(self, chrom, start, end):
+        """Returns True if any position in chrom lies within [start, end]."""
+        positions = self.positions.get(chrom)
+        if not positions:
+            return False
+        i = bisect_left(positions, start)
+        return i < len(positions) and positions[i] <= end
+
+    def within(self, chrom, start, end):
+        """Returns the sorted positions in chrom that lie within [start, end]."""
+        positions = self.positions.get(chrom)
+        if not positions:
+            return []
+        i = bisect_left(positions, start)
+        j = bisect_left(positions, end + 1, i)
+        return positions[i:j]
+
+    def windows(self, chrom, start, end, padding):
+        """Yields (start, end) for the windows of +/-padding bp around the positions in
+        chrom that lie within [start, end], clipped to [start, end]; windows that overlap
+        or are adjacent are merged."""
+        current = None
+        for pos in self.within(chrom, start, end):
+            windowStart = max(start, pos - padding)
+            windowEnd = min(end, pos + padding)
+            if current is not None and windowStart <= current[1] + 1:
+                current[1] = windowEnd
+            else:
+                if current is not None:
+                    yield tuple(current)
+                current = [windowStart, windowEnd]
+        if current is not None:
+            yield tuple(current)
+
+
+def merge_sorted_regions(regions):
+    """Yields (chrom, start, end) for the merged regions of a stream of (chrom, start, end)
+    in which the regions of each chromosome are contiguous and sorted by start: each region
+    is merged with the previous one while they overlap, so only one region is kept."""
+    current = None
+    for chrom, start, end in regions:
+        if current is not None and chrom == current[0] and start <= current[2]:
+            if end > current[2]:
+                current[2] = end
+        else:
+            if current is not None:
+                yield tuple(current)
+            current = [chrom, start, end]
+    if current is not None:
+        yield tuple(current)
+
+
+def merge_regions(regions):
+    """Yields (chrom, start, end) for the merged regions in a dict of [start, end] lists
+    per chromosome: chromosomes in string order, regions sorted by start and merged
+    while they overlap (as done by Somatypus_MergeRegions.py)."""
+    for chrom in sorted(regions):
+        for region in merge_sorted_regions((chrom, start, end) for start, end in sorted(regions[chrom])):
+            yield region
+
+
+def read_vcf_positions(vcfFile):
+    """Reads the CHROM and POS columns of a VCF into a finalised PositionIndex."""
+    index = PositionIndex()
+    with VcfReader(vcfFile) as vcf:
+        for rec in vcf:
+            index.add(rec.chrom, int(rec.pos))
+    return index.finalise()
+
+
+class IntervalIndex(object):
+    """Integer intervals per chromosome, supporting point queries."""
+
+    def __init__(self):
+        self.intervals = {}
+        self.starts = {}
+        self.ends = {}
+
+    def add(self, chrom, start, end):
+        if chrom in self.intervals:
+            self.intervals[chrom].append((start, end))
+        else:
+            self.intervals[chrom] = [(start, end)]
+
+    def finalise(self):
+        """Sorts and merges overlapping intervals; must be called before querying."""
+        for chrom, intervals in self.intervals.items():
+            intervals.sort()
+            starts = []
+            ends = []
+            for start, end in intervals:
+                if ends and start <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], end)
+                else:
+                    starts.append(start)
+                    ends.append(end)
+            self.starts[chrom] = starts
+            self.ends[chrom] = ends
+        self.intervals = {}
+        return self
+
+    def contains(self, chrom, pos):
+        """Returns True if pos lies within any interval of chrom."""
+        starts = self.starts.get(chrom)
+        if not starts:
+            return False
+        i = bisect_right(starts, pos) - 1
+        return i >= 0 and self.ends[chrom][i] >= pos
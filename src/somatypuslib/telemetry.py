@@ -0,0 +1,105 @@
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# somatypuslib/telemetry.py
+# Recording the resources used by the pipeline steps, and the record counts of the scripts
+
+
+"""
+Functions for measuring the resources used by the pipeline: the CPU time and bytes read and
+written by a process (including its finished child processes, as reported by Linux in
+/proc), and the record counts reported by the Somatypus scripts.
+
+A script reports its record counts with record_counts(); the counts are appended, as a JSON
+object, to the file named by the environment variable SOMATYPUS_COUNTS, which is set by
+Somatypus_Telemetry.py when it runs the script (otherwise, nothing is recorded). Telemetry
+records are JSON objects written one per line to the telemetry file of a run, in a single
+write so that concurrent steps can share the file.
+"""
+
+
+import os
+import json
+
+
+# Environment variable naming the file where scripts record their counts
+COUNTSVAR = 'SOMATYPUS_COUNTS'
+
+# Clock ticks per second (unit of the CPU times in /proc)
+try:
+    TICKS = float(os.sysconf('SC_CLK_TCK'))
+except (ValueError, OSError, AttributeError):
+    TICKS = 100.0
+
+
+def record_counts(**counts):
+    """Records the counts (such as the numbers of records read and written) of the running
+    script, if it is run by Somatypus_Telemetry.py."""
+    path = os.environ.get(COUNTSVAR)
+    if path:
+        with open(path, 'a') as out:
+            out.write(json.dumps(counts) + '\n')
+
+
+def read_counts(path):
+    """Returns the counts recorded in a counts file (adding up repeated counts)."""
+    counts = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    values = json.loads(line)
+                except ValueError:
+                    continue
+                for key, value in values.items():
+                    counts[key] = counts.get(key, 0) + value
+    return counts
+
+
+def process_io(pid='self'):
+    """Returns the bytes read and written by a process and its finished child processes
+    (rchar and wchar in /proc/PID/io), or (None, None) if they are not available."""
+    try:
+        values = {}
+        with open('/proc/' + str(pid) + '/io', 'r') as f:
+            for line in f:
+                key, value = line.split(':')
+                values[key] = int(value)
+        return values['rchar'], values['wchar']
+    except (IOError, OSError, ValueError, KeyError):
+        return None, None
+
+
+def process_cpu(pid):
+    """Returns the user and system CPU time (seconds) used by a process and its finished
+    child processes (from /proc/PID/stat), or (None, None) if they are not available."""
+    try:
+        with open('/proc/' + str(pid) + '/stat', 'r') as f:
+            # Fields after the command name (which may contain spaces), from field 3 (state)
+            fields = f.read().rsplit(')', 1)[1].split()
+        utime, stime, cutime, cstime = [int(value) for value in fields[11:15]]
+        return (utime + cutime) / TICKS, (stime + cstime) / TICKS
+    except (IOError, OSError, ValueError, IndexError):
+        return None, None
+
+
+def append_record(path, record):
+    """Appends a telemetry record (a dict) to a telemetry file."""
+    line = json.dumps(record, sort_keys=True) + '\n'
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def read_records(path):
+    """Returns the telemetry records in a telemetry file (skipping incomplete lines)."""
+    records = []
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
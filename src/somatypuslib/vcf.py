@@ -0,0 +1,330 @@
+# SOMATYPUS: A PLATYPUS-BASED VARIANT CALLING PIPELINE FOR CANCER DATA
+# Adrian Baez-Ortega, Transmissible Cancer Group, University of Cambridge
+
+# somatypuslib/vcf.py
+# Coordinate-ordered reading and merging of VCF files
+
+
+"""
+A lazy VCF record type and a buffered VCF reader, and functions for reading the records of
+VCF files in coordinate order, and for merging several VCFs into a single coordinate-ordered
+stream without loading them into memory.
+
+VcfRecord keeps the raw line of a record and splits off only its fixed columns (CHROM to
+INFO); the FORMAT and sample columns are split only if they are accessed. Sample values are
+accessed by FORMAT key (such as 'NR' or 'NV').
+
+VCFs are opened with open_vcf(), which reads BGZF and gzip files transparently, and writes
+BGZF when the output path ends in '.gz'.
+
+Chromosomes are ordered naturally (1, 2, ..., 10, ..., X, Y), as done by 'vcf-sort -c'.
+Platypus writes its calls in the chromosome order of the reference, and splitting MNPs
+leaves some records slightly out of order, so each VCF is first scanned once to find the
+byte offset of each chromosome and the largest backward step in position within it; the
+chromosomes are then read in natural order, and a small heap of that size restores the
+position order. Files in which a chromosome is not contiguous are sorted in memory.
+"""
+
+
+import heapq
+import re
+from somatypuslib.bgzf import BgzfWriter, CompressedReader
+
+
+_DIGITS = re.compile(r'(\d+)')
+
+# Buffer size (bytes) for reading VCF files
+BUFSIZE = 1 << 20
+
+# Index of each FORMAT key, per FORMAT string
+_formatKeys = {}
+
+
+def open_vcf(path, mode='r'):
+    """Opens a VCF file. For reading, gzip and BGZF files (detected by their first bytes)
+    are decompressed transparently. For writing, the file is BGZF-compressed if the path
+    ends in '.gz'."""
+    if mode.startswith('w'):
+        if path.endswith('.gz'):
+            return BgzfWriter(path)
+        return open(path, mode)
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    if magic == '\x1f\x8b':
+        return CompressedReader(path)
+    return open(path, 'rb', BUFSIZE)
+
+
+def derived_path(vcfFile, suffix):
+    """Returns the path of a file derived from a VCF file: the VCF path without its
+    extension (.vcf or .vcf.gz), followed by suffix. Derived VCFs (suffix ending in '.vcf')
+    of compressed VCFs are compressed as well."""
+    if vcfFile.endswith('.gz'):
+        return vcfFile[:-7] + suffix + ('.gz' if suffix.endswith('.vcf') else '')
+    return vcfFile[:-4] + suffix
+
+
+class VcfRecord(object):
+    """A VCF data line. The fixed columns (CHROM to INFO) are available as attributes (all
+    strings); FORMAT and the sample columns are split only if they are accessed."""
+
+    __slots__ = ('line', 'chrom', 'pos', 'id', 'ref', 'alt', 'qual', 'filter', 'info',
+                 '_rest', '_samples')
+
+    def __init__(self, line):
+        self.line = line
+        cols = line.split('\t', 8)
+        if len(cols) == 9:
+            self._rest = cols[8]
+        else:
+            cols[-1] = cols[-1].rstrip('\r\n')
+            self._rest = None
+        self.chrom, self.pos, self.id, self.ref, self.alt, self.qual, self.filter, self.info = cols[:8]
+        self._samples = None
+
+    @property
+    def alts(self):
+        return self.alt.split(',')
+
+    @property
+    def fixed(self):
+        """List of the columns before FORMAT (CHROM to INFO)."""
+        return [self.chrom, self.pos, self.id, self.ref, self.alt, self.qual, self.filter, self.info]
+
+    def _split_rest(self):
+        # Splits FORMAT and the sample columns into a single list
+        if self._samples is None:
+            if self._rest is None:
+                self._samples = [None]
+            else:
+                self._samples = self._rest.split('\t')
+                self._samples[-1] = self._samples[-1].rstrip('\r\n')
+        return self._samples
+
+    @property
+    def format(self):
+        """FORMAT column, or None if the record has none."""
+        return self._split_rest()[0]
+
+    @property
+    def samples(self):
+        """List of the sample columns."""
+        return self._split_rest()[1:]
+
+    def format_index(self, key):
+        """Returns the position of a key in the FORMAT column (KeyError if absent)."""
+        format = self.format
+        keys = _formatKeys.get(format)
+        if keys is None:
+            keys = _formatKeys[format] = dict((k, i) for i, k in enumerate(format.split(':')))
+        return keys[key]
+
+    def sample_values(self, key):
+        """Returns the values of a FORMAT key (as strings) in all the samples."""
+        i = self.format_index(key)
+        return [sample.split(':')[i] for sample in self._split_rest()[1:]]
+
+    def sample_fields(self, *keys):
+        """Returns a list with the values of each FORMAT key (as strings) in all the samples,
+        splitting each sample only once."""
+        indices = [self.format_index(key) for key in keys]
+        values = [sample.split(':') for sample in self._split_rest()[1:]]
+        return [[v[i] for v in values] for i in indices]
+
+
+class VcfReader(object):
+    """Reads a (possibly compressed) VCF file, with a large buffer. The header lines are
+    read on opening (self.header); iterating over the reader yields a VcfRecord per data
+    line."""
+
+    def __init__(self, vcfFile):
+        self.file = open_vcf(vcfFile)
+        self.header = []
+        self._first = None
+        for line in self.file:
+            if not line.startswith('#'):
+                self._first = line
+                break
+            self.header.append(line)
+
+    def lines(self):
+        """Yields the raw data lines of the file."""
+        if self._first is not None:
+            yield self._first
+            self._first = None
+        for line in self.file:
+            yield line
+
+    def __iter__(self):
+        for line in self.lines():
+            yield VcfRecord(line)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def sample_names(header):
+    """Returns the sample names in the #CHROM line of a list of VCF header lines (an empty
+    list if there is no #CHROM line)."""
+    if header and header[-1].startswith('#CHROM'):
+        return header[-1].rstrip('\r\n').split('\t')[9:]
+    return []
+
+
+def sample_order(names, newNames):
+    """Returns the indices, in a list of sample names, of the sample names in newNames
+    (ValueError if the lists hold different samples)."""
+    if sorted(names) != sorted(newNames):
+        raise ValueError('Different samples: ' + ', '.join(names) + ' / ' + ', '.join(newNames))
+    index = dict((name, i) for i, name in enumerate(names))
+    return [index[name] for name in newNames]
+
+
+def reorder_samples(line, order):
+    """Returns a VCF data line with its sample columns in a new order, given as the indices
+    of the current sample columns (see sample_order())."""
+    cols = line.rstrip('\r\n').split('\t')
+    samples = cols[9:]
+    return '\t'.join(cols[:9] + [samples[i] for i in order]) + '\n'
+
+
+def chrom_key(chrom):
+    """Returns a sort key that orders chromosome names naturally (chr2 before chr10)."""
+    return tuple((0, int(part), '') if part.isdigit() else (1, 0, part)
+                 for part in _DIGITS.split(chrom) if part != '')
+
+
+def _index(vcfFile):
+    """Returns a list of [chrom, offset, slack] for the chromosome blocks of a VCF, and
+    whether each chromosome appears in a single block."""
+    blocks = []
+    seen = set()
+    contiguous = True
+    offset = 0
+    lastChrom = None
+    maxPos = 0
+    with open_vcf(vcfFile) as vcf:
+        for line in vcf:
+            if not line.startswith('#'):
+                chrom, pos = line.split('\t', 2)[:2]
+                pos = int(pos)
+                if chrom != lastChrom:
+                    if chrom in seen:
+                        contiguous = False
+                    seen.add(chrom)
+                    blocks.append([chrom, offset, 0])
+                    lastChrom = chrom
+                    maxPos = pos
+                elif pos < maxPos:
+                    blocks[-1][2] = max(blocks[-1][2], maxPos - pos)
+                else:
+                    maxPos = pos
+            offset = offset + len(line)
+    return blocks, contiguous
+
+
+def chrom_ranks(chroms):
+    """Returns a dict giving the natural-order rank of each chromosome name."""
+    return dict((chrom, i) for i, chrom in enumerate(sorted(set(chroms), key=chrom_key)))
+
+
+def _expanded(rank, fileIndex, i, chrom, line, expand):
+    """Returns the records derived from a line by expand(), numbering them after the line."""
+    return [(rank, pos, fileIndex, (i, j), chrom, newLine, kind)
+            for j, (pos, newLine, kind) in enumerate(expand(line))]
+
+
+def _read(vcfFile, fileIndex, blocks, contiguous, ranks, select, expand=None):
+    """Yields the records of an indexed VCF in natural coordinate order."""
+
+    # A chromosome is split into several blocks: sort the whole file in memory
+    if not contiguous:
+        records = []
+        with open_vcf(vcfFile) as vcf:
+            for i, line in enumerate(vcf):
+                if not line.startswith('#') and (select is None or select(line)):
+                    chrom, pos = line.split('\t', 2)[:2]
+                    if expand is None:
+                        records.append((ranks[chrom], int(pos), fileIndex, i, chrom, line))
+                    else:
+                        records.extend(_expanded(ranks[chrom], fileIndex, i, chrom, line, expand))
+        records.sort()
+        for rec in records:
+            yield rec
+        return
+
+    # Read each chromosome block in natural order, reordering records within the block slack
+    blocks.sort(key=lambda b: ranks[b[0]])
+    with open_vcf(vcfFile) as vcf:
+        for blockChrom, offset, slack in blocks:
+            rank = ranks[blockChrom]
+            vcf.seek(offset)
+            heap = []
+            maxPos = 0
+            for i, line in enumerate(vcf):
+                chrom, pos = line.split('\t', 2)[:2]
+                if chrom != blockChrom:
+                    break
+                if select is not None and not select(line):
+                    continue
+                pos = int(pos)
+                if expand is None:
+                    if slack == 0:
+                        yield (rank, pos, fileIndex, i, chrom, line)
+                        continue
+                    heapq.heappush(heap, (rank, pos, fileIndex, i, chrom, line))
+                else:
+                    # Derived records are never before the line they come from
+                    for rec in _expanded(rank, fileIndex, i, chrom, line, expand):
+                        heapq.heappush(heap, rec)
+                maxPos = max(maxPos, pos)
+                while heap and heap[0][1] < maxPos - slack:
+                    yield heapq.heappop(heap)
+            while heap:
+                yield heapq.heappop(heap)
+
+
+def sorted_records(vcfFile, fileIndex=0, select=None):
+    """Yields the data lines of a VCF in natural coordinate order, as tuples of
+    (chromosome rank, position, fileIndex, line number, chromosome, line). Records with the
+    same coordinates keep their order in the file. If select is given, only the lines for
+    which select(line) is true are yielded."""
+    blocks, contiguous = _index(vcfFile)
+    ranks = chrom_ranks(b[0] for b in blocks)
+    return _read(vcfFile, fileIndex, blocks, contiguous, ranks, select)
+
+
+def merge_sorted(vcfFiles, select=None, expand=None):
+    """Merges the data lines of several VCFs into a single stream in natural coordinate
+    order, yielding the same tuples as sorted_records(). Records with the same coordinates
+    are output in the order of the files in the list. If select is given, only the lines
+    for which select(line) is true are merged.
+
+    If expand is given, each (selected) line is replaced by the items in the list returned
+    by expand(line), as tuples of (position, value, kind), where the value is any object
+    derived from the line (such as a VcfRecord) and each position must not be smaller than
+    that of the original line. These are merged as tuples of (chromosome rank, position,
+    fileIndex, (line number, index in the list), chromosome, value, kind)."""
+    indices = [_index(vcfFile) for vcfFile in vcfFiles]
+    ranks = chrom_ranks(b[0] for blocks, contiguous in indices for b in blocks)
+    return heapq.merge(*[_read(vcfFile, i, blocks, contiguous, ranks, select, expand)
+                         for i, (vcfFile, (blocks, contiguous)) in enumerate(zip(vcfFiles, indices))])
+
+
+def group_by_position(records):
+    """Groups a coordinate-ordered stream of records into lists of records sharing the same
+    chromosome and position."""
+    group = []
+    for rec in records:
+        if group and (rec[4] != group[0][4] or rec[1] != group[0][1]):
+            yield group
+            group = []
+        group.append(rec)
+    if group:
+        yield group
@@ -9,75 +9,109 @@
 
 # INPUT
 # vcfFile: path to input VCF file
+# outFormat: format of the NR and NV output files, 'text' (tab-separated) or 'npy' (NumPy binary matrices)
+#            (optional; default: text)
 
 
 """
 This script is used to extract the metadata (CHROM, POS, ID, REF, ALT, QUAL, FILTER, INFO), 
 the total number of reads (NR) and the number of reads supporting the variant (NV), from 
 every variant in a VCF file, into three respective output text files. 
-"""
 
+With the npy output format, NR and NV are written as binary matrices (variants x samples,
+unsigned 32-bit integers) in NumPy .npy format, together with the metadata text file and a
+text file with the sample names. The VCF is read in blocks, which are parsed and written at
+once, and the matrices can be loaded without any parsing (numpy.load with mmap_mode='r'
+maps them into memory; see BasicManipulation.R for loading them in R). This requires NumPy.
+"""
 
 import sys
-import gzip
 import os
 import re
 
+# The Somatypus library is in the src folder
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'src'))
+from somatypuslib.vcf import VcfReader, derived_path, sample_names
+from somatypuslib.readcounts import count_matrices, blocks
+
+try:
+    import numpy
+    from somatypuslib.npy import NpyWriter
+except ImportError:
+    numpy = None
+
 
-# If not 1 argument: print help
-if len(sys.argv) != 2:
+# If not 1 or 2 arguments: print help
+if len(sys.argv) not in (2, 3):
     print '\nExtractVcfData.py: Extracts the metadata (CHROM, POS, ID, REF, ALT, QUAL, FILTER, INFO), the'
     print '                   total number of reads (NR) and the number of reads supporting the variant (NV),'
     print '                   from every variant in a VCF file, into three respective output text files.'
-    print '            Input: Path to input VCF file.'
-    print '            Usage: ExtractVcfData.py /path/to/file.vcf\n'
+    print '                   NR and NV can also be written as binary matrices (variants x samples, unsigned'
+    print '                   32-bit integers) in NumPy .npy format, with a text file with the sample names.'
+    print '            Input: Path to input VCF file (.vcf or .vcf.gz).'
+    print '                   Format of the NR and NV output files: text or npy (optional; default: text).'
+    print '            Usage: ExtractVcfData.py /path/to/file.vcf [text|npy]\n'
     sys.exit(0)
 
 
-script, vcfFile = sys.argv
+script, vcfFile = sys.argv[:2]
+outFormat = sys.argv[2] if len(sys.argv) == 3 else 'text'
+if outFormat not in ('text', 'npy'):
+    print '\nERROR: Output format must be text or npy\n'
+    sys.exit(1)
+if outFormat == 'npy' and numpy is None:
+    print '\nERROR: NumPy is required for the npy output format\n'
+    sys.exit(1)
 
 # Compose path to output VCF file
-outFileNR = vcfFile[:-4] + '_NR.txt'
-outFileNV = vcfFile[:-4] + '_NV.txt'
-outFileMD = vcfFile[:-4] + '_Metadata.txt'
+suffix = '.txt' if outFormat == 'text' else '.npy'
+outFileNR = derived_path(vcfFile, '_NR' + suffix)
+outFileNV = derived_path(vcfFile, '_NV' + suffix)
+outFileMD = derived_path(vcfFile, '_Metadata.txt')
 print '\nInput file: ', vcfFile
 print 'Output NR file: ', outFileNR
 print 'Output NV file: ', outFileNV
 print 'Output metadata file: ', outFileMD
+if outFormat == 'npy':
+    outFileSamples = derived_path(vcfFile, '_Samples.txt')
+    print 'Output sample names file: ', outFileSamples
 
 
 
-with open(vcfFile, 'r') as vcf, open(outFileNR, 'w') as outNR, open(outFileNV, 'w') as outNV, open(outFileMD, 'w') as outMD:
-    i = 0
-    for line in vcf:
-        i = i + 1
-        # Skip first 47 header lines, and write column headers
-        if i == 48:
-            MDhead = line[1:].strip().split('\t')[:8]
-            NRhead = line.strip().split('\t')[9:]
-            outMD.write('\t'.join(MDhead) + '\n')
-            outNR.write('\t'.join(NRhead) + '\n')
-            outNV.write('\t'.join(NRhead) + '\n')
-            
-        elif i > 48:
+if outFormat == 'text':
+    with VcfReader(vcfFile) as vcf, open(outFileNR, 'w') as outNR, open(outFileNV, 'w') as outNV, open(outFileMD, 'w') as outMD:
+        # Write column headers (from the last header line)
+        columns = vcf.header[-1][1:].strip().split('\t')
+        outMD.write('\t'.join(columns[:8]) + '\n')
+        outNR.write('\t'.join(columns[9:]) + '\n')
+        outNV.write('\t'.join(columns[9:]) + '\n')
+
+        for rec in vcf:
             # Extract metadata
-            metadata = line.strip().split('\t')[:8]
-            outMD.write('\t'.join(metadata) + '\n')
+            outMD.write('\t'.join(rec.fixed) + '\n')
             
             # Extract NR and NV from sample data
-            NR = []
-            NV = []
-            data = line.strip().split('\t')[9:]
-            for record in data:
-                # Extract total reads (nr) and supp. reads (nv)
-                nr = record.split(':')[4]
-                nv = record.split(':')[5]
-                # Add coverage and VAF values to list
-                NR.append(nr)
-                NV.append(nv)
-                
-            outNR.write('\t'.join(NR) + '\n')
-            outNV.write('\t'.join(NV) + '\n')
+            nr, nv = rec.sample_fields('NR', 'NV')
+            outNR.write('\t'.join(nr) + '\n')
+            outNV.write('\t'.join(nv) + '\n')
+
+else:
+    with VcfReader(vcfFile) as vcf:
+        # Write sample names (from the #CHROM header line)
+        samples = sample_names(vcf.header)
+        with open(outFileSamples, 'w') as outSamples:
+            outSamples.writelines(name + '\n' for name in samples)
+
+        # Extract the metadata, NR and NV of each block of variants
+        with NpyWriter(outFileNR, len(samples)) as outNR, NpyWriter(outFileNV, len(samples)) as outNV, \
+             open(outFileMD, 'w') as outMD:
+            outMD.write('\t'.join(['CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO']) + '\n')
+            for block in blocks(vcf.lines()):
+                outMD.writelines('\t'.join(line.rstrip('\r\n').split('\t', 8)[:8]) + '\n' for line in block)
+                nr, nv = count_matrices(block)
+                outNR.write(nr)
+                outNV.write(nv)
+        print outNR.rows, 'variants,', len(samples), 'samples'
             
                 
 print 'Done!\n'